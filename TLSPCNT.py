@@ -1,14 +1,328 @@
+import json
 import os
-from ctypes import cdll, c_long, c_uint32, c_uint16,byref,create_string_buffer, \
-                    c_bool, c_char_p,c_int,c_int16, c_int32,c_double, \
-                    sizeof,c_voidp
+from ctypes import CDLL, cdll, c_uint32, c_uint16,byref,create_string_buffer, \
+                    c_char_p,c_int16, c_int32,c_double, \
+                    POINTER
+
+ViStatus = c_int32
+ViSession = c_uint32
+ViBoolean = c_uint16
+ViBuf = c_char_p
+
+# restype and argtypes of every driver function used by TLSPCNT
+_SIGNATURES = {
+    'TLSPCNT_init': (ViStatus, [ViBuf, ViBoolean, ViBoolean, POINTER(ViSession)]),
+    'TLSPCNT_close': (ViStatus, [ViSession]),
+    'TLSPCNT_findRsrc': (ViStatus, [ViSession, POINTER(c_uint32)]),
+    'TLSPCNT_getRsrcName': (ViStatus, [ViSession, c_uint32, ViBuf]),
+    'TLSPCNT_getRsrcInfo': (ViStatus, [ViSession, c_uint32, ViBuf, ViBuf, ViBuf, POINTER(ViBoolean)]),
+    'TLSPCNT_writeRegister': (ViStatus, [ViSession, c_int16, c_int16]),
+    'TLSPCNT_readRegister': (ViStatus, [ViSession, c_int16, POINTER(c_int16)]),
+    'TLSPCNT_presetRegister': (ViStatus, [ViSession]),
+    'TLSPCNT_setDisplayBrightness': (ViStatus, [ViSession, c_double]),
+    'TLSPCNT_getDisplayBrightness': (ViStatus, [ViSession, POINTER(c_double)]),
+    'TLSPCNT_errorMessage': (ViStatus, [ViSession, ViStatus, ViBuf]),
+    'TLSPCNT_reset': (ViStatus, [ViSession]),
+    'TLSPCNT_self_test': (ViStatus, [ViSession, POINTER(c_int16), ViBuf]),
+    'TLSPCNT_revision_query': (ViStatus, [ViSession, ViBuf, ViBuf]),
+    'TLSPCNT_identification_query': (ViStatus, [ViSession, ViBuf, ViBuf, ViBuf]),
+    'TLSPCNT_getCalibrationMessage': (ViStatus, [ViSession, ViBuf]),
+    'TLSPCNT_startZeroing': (ViStatus, [ViSession]),
+    'TLSPCNT_abortZeroing': (ViStatus, [ViSession]),
+    'TLSPCNT_getZeroState': (ViStatus, [ViSession, POINTER(ViBoolean)]),
+    'TLSPCNT_setZeroValue': (ViStatus, [ViSession, c_double]),
+    'TLSPCNT_getZeroValue': (ViStatus, [ViSession, POINTER(c_double)]),
+    'TLSPCNT_getFrequencyCountThreshold': (ViStatus, [ViSession, POINTER(c_uint16)]),
+    'TLSPCNT_setFrequencyCountThreshold': (ViStatus, [ViSession, c_uint16]),
+    'TLSPCNT_startFrequencyCounting': (ViStatus, [ViSession]),
+    'TLSPCNT_stopFrequencyCounting': (ViStatus, [ViSession]),
+    'TLSPCNT_getFrequencyCountingState': (ViStatus, [ViSession, POINTER(ViBoolean)]),
+    'TLSPCNT_setArrayLenght': (ViStatus, [ViSession, c_uint32]),
+    'TLSPCNT_getArrayLenght': (ViStatus, [ViSession, POINTER(c_uint32)]),
+    'TLSPCNT_setBinWidth': (ViStatus, [ViSession, c_uint32]),
+    'TLSPCNT_getBinWidth': (ViStatus, [ViSession, POINTER(c_uint32)]),
+    'TLSPCNT_setDeadTime': (ViStatus, [ViSession, c_uint32]),
+    'TLSPCNT_getDeadtime': (ViStatus, [ViSession, POINTER(c_uint32)]),
+    'TLSPCNT_setAverageCount': (ViStatus, [ViSession, c_uint16]),
+    'TLSPCNT_getAverageCount': (ViStatus, [ViSession, POINTER(c_uint16)]),
+    'TLSPCNT_resetStatistics': (ViStatus, [ViSession]),
+    'TLSPCNT_getFrequency': (ViStatus, [ViSession] + [POINTER(c_double)] * 4),
+    'TLSPCNT_getCount': (ViStatus, [ViSession, POINTER(c_int32)]),
+    'TLSPCNT_getTime': (ViStatus, [ViSession, POINTER(c_double)]),
+    'TLSPCNT_getBins': (ViStatus, [ViSession, POINTER(c_int32), POINTER(c_uint32)]),
+}
+
+# seconds per unit of setBinWidth/getBinWidth and setDeadTime/getDeadTime
+BIN_WIDTH_UNIT = 1e-3
+DEAD_TIME_UNIT = 1e-9
+
+DEFAULT_DLL_PATH = r'C:\Program Files\IVI Foundation\VISA\Win64\Bin'
+DLL_NAME = 'TLSPCNT_64.dll'
+CONFIG_PATH = os.path.join(os.path.expanduser('~'), '.tlspcnt.json')
+
+def findDriver(dll_path=None):
+    """
+    Locates TLSPCNT_64.dll. The first of these that is set wins:
+    
+    (1) dll_path
+    (2) the environment variable TLSPCNT_DLL
+    (3) "dll_path" in the JSON file named by the environment variable TLSPCNT_CONFIG, default ~/.tlspcnt.json
+    (4) DEFAULT_DLL_PATH
+    
+    Each may name the library itself or the directory containing it.
+    
+    Returns:
+        str: Path of the library.
+    """
+    path = dll_path or os.environ.get('TLSPCNT_DLL')
+    if not path:
+        try:
+            with open(os.environ.get('TLSPCNT_CONFIG', CONFIG_PATH)) as f:
+                path = json.load(f).get('dll_path')
+        except (OSError, ValueError):
+            pass
+    path = path or DEFAULT_DLL_PATH
+    if os.path.isdir(path) or not os.path.splitext(path)[1]:
+        path = os.path.join(path, DLL_NAME)
+    return path
+
+def _signed(code):
+    return code - (1 << 32)
+
+# VISA status codes the error classes are mapped from
+VI_ERROR_INV_OBJECT = _signed(0xBFFF000E)
+VI_ERROR_RSRC_LOCKED = _signed(0xBFFF000F)
+VI_ERROR_RSRC_NFOUND = _signed(0xBFFF0011)
+VI_ERROR_TMO = _signed(0xBFFF0015)
+VI_ERROR_IO = _signed(0xBFFF003E)
+VI_ERROR_RSRC_BUSY = _signed(0xBFFF0072)
+VI_ERROR_CONN_LOST = _signed(0xBFFF00A6)
+VI_ERROR_PARAMETER1 = _signed(0xBFFC0001)
+VI_ERROR_PARAMETER8 = _signed(0xBFFC0008)
+
+class TLSPCNTError(NameError):
+    """
+    Error status returned by the driver. Derives from NameError, which was raised for
+    every error before, so existing handlers keep working.
+    
+    Attributes:
+        status(int) : The status code.
+        message(str) : Description of the status code from TLSPCNT_errorMessage.
+    """
+    def __init__(self, status, message=''):
+        self.status = status
+        self.message = message
+        # args must hold the constructor arguments, or the error cannot be unpickled
+        super().__init__(status, message)
+
+    def __str__(self):
+        return '%s (0x%08X)' % (self.message or 'Unknown Status Code', self.status & 0xFFFFFFFF)
+
+class ParameterError(TLSPCNTError):
+    """A parameter was out of range (VI_ERROR_PARAMETER1..8)."""
+
+class ResourceNotFoundError(TLSPCNTError):
+    """The resource name does not match a connected device."""
+
+class ResourceBusyError(TLSPCNTError):
+    """The device is in use or locked by another session."""
+
+class TransientError(TLSPCNTError):
+    """The connection to the device failed. Reopening the device may recover from it."""
+
+class DeviceIOError(TransientError):
+    """VI_ERROR_IO"""
+
+class DeviceTimeoutError(TransientError):
+    """VI_ERROR_TMO"""
+
+class ConnectionLostError(TransientError):
+    """VI_ERROR_CONN_LOST"""
+
+class InvalidSessionError(TransientError):
+    """VI_ERROR_INV_OBJECT, e.g. the session was invalidated by a USB disconnect."""
+
+_ERROR_CLASSES = {
+    VI_ERROR_INV_OBJECT: InvalidSessionError,
+    VI_ERROR_RSRC_LOCKED: ResourceBusyError,
+    VI_ERROR_RSRC_NFOUND: ResourceNotFoundError,
+    VI_ERROR_TMO: DeviceTimeoutError,
+    VI_ERROR_IO: DeviceIOError,
+    VI_ERROR_RSRC_BUSY: ResourceBusyError,
+    VI_ERROR_CONN_LOST: ConnectionLostError,
+}
+
+def errorClass(status):
+    """The TLSPCNTError subclass raised for a status code."""
+    if VI_ERROR_PARAMETER1 <= status <= VI_ERROR_PARAMETER8:
+        return ParameterError
+    return _ERROR_CLASSES.get(status, TLSPCNTError)
+
+def prototypeDriver(dll):
+    """Sets restype and argtypes of the driver functions in _SIGNATURES, skipping functions of Python backends."""
+    for name, (restype, argtypes) in _SIGNATURES.items():
+        fn = getattr(dll, name, None)
+        if hasattr(fn, 'argtypes'):
+            fn.restype = restype
+            fn.argtypes = argtypes
+
+def rawFunction(dll, name, restype=None):
+    """
+    A driver function without argtypes, for the hot-path getters.
+    
+    Args:
+        dll : ctypes library, or a backend or driver wrapper. Wrappers providing rawFunction(name, restype)
+        are asked for theirs.
+        restype : Default: the restype from _SIGNATURES.
+    """
+    restype = _SIGNATURES[name][0] if restype is None else restype
+    if isinstance(dll, CDLL):
+        fn = dll[name]
+        fn.restype = restype
+        return fn
+    raw = getattr(dll, 'rawFunction', None)
+    if raw is not None:
+        return raw(name, restype)
+    return getattr(dll, name)
 
 class TLSPCNT:
-    def __init__(self,dll_path=r'C:\Program Files\IVI Foundation\VISA\Win64\Bin'):
-        self.dll = cdll.LoadLibrary(os.path.join(dll_path,'TLSPCNT_64.dll'))
+    # attributes set by _bindDriver, see __getattr__
+    _DRIVER_ATTRIBUTES = frozenset(('dll', '_getCountFn', '_getFrequencyFn', '_getTimeFn', '_count', '_countRef',
+                                    '_time', '_timeRef', '_freq', '_freqRefs'))
 
-        self.devSession = c_long()
+    def __init__(self,dll_path=None,backend=None):
+        """
+        The driver library is only loaded on the first call that needs it, so creating an
+        instance is cheap.
+        
+        Args:
+            dll_path(str) : TLSPCNT_64.dll or the directory containing it, see findDriver for the default.
+            backend : Driver to use instead of TLSPCNT_64.dll. Any object providing the TLSPCNT_*
+            functions with the C calling convention of the DLL (out-parameters passed with byref),
+            e.g. spcnt_simulator.SimulatedBackend. dll_path is ignored when given.
+        """
+        self.devSession = ViSession()
         self.devSession.value = 0
+        self._settings = None
+        self.instrumentation = None
+        self.dll_path = dll_path
+        if backend is not None:
+            self._bindDriver(backend)
+
+    def __getattr__(self, name):
+        # only called for missing attributes: load the driver on first use
+        if name in TLSPCNT._DRIVER_ATTRIBUTES and 'dll' not in self.__dict__:
+            self.loadDriver()
+            return getattr(self, name)
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
+    def loadDriver(self):
+        """Loads and binds the driver library now instead of on first use."""
+        if 'dll' not in self.__dict__:
+            self._bindDriver(cdll.LoadLibrary(findDriver(self.dll_path)))
+        return self.dll
+
+    def _bindDriver(self, dll):
+        """
+        Prototypes the driver functions from _SIGNATURES once and caches the hot-path
+        functions together with preallocated out-parameters.
+        
+        The hot-path getters get their own function objects with only restype set: they are
+        always called with the preallocated, exactly typed arguments below, and skipping the
+        argtypes check saves the costly from_param conversion of every byref argument.
+        """
+        self.dll = dll
+        prototypeDriver(dll)
+
+        self._getCountFn = rawFunction(dll, 'TLSPCNT_getCount')
+        self._getFrequencyFn = rawFunction(dll, 'TLSPCNT_getFrequency')
+        self._getTimeFn = rawFunction(dll, 'TLSPCNT_getTime')
+        self._count = c_int32()
+        self._countRef = byref(self._count)
+        self._time = c_double()
+        self._timeRef = byref(self._time)
+        self._freq = (c_double(), c_double(), c_double(), c_double())
+        self._freqRefs = tuple(byref(v) for v in self._freq)
+
+    def enableSettingsCache(self, enabled=True):
+        """
+        Serves the settings getters (bin width, array length, dead time, average count,
+        frequency count threshold, display brightness and zero value) from memory.
+        
+        Setters write through to the device and update the cache. The cache is cleared by
+        open, close, reset, presetRegister and zeroing, and is only valid as long as no other
+        application changes the settings of the device.
+        """
+        self._settings = {} if enabled else None
+
+    def invalidateSettings(self, *names):
+        """Drops the named cached settings, or all of them, so the next getter calls query the device again."""
+        if not self._settings:
+            return
+        if not names:
+            self._settings.clear()
+        for name in names:
+            self._settings.pop(name, None)
+
+    def refresh(self):
+        """
+        Re-reads all cached settings from the device.
+        
+        Returns:
+            dict: The current settings.
+        """
+        self.invalidateSettings()
+        return {'binWidth': self.getBinWidth(),
+                'arrayLength': self.getArrayLength(),
+                'deadTime': self.getDeadTime(),
+                'averageCount': self.getAverageCount(),
+                'frequencyCountThreshold': self.getFrequencyCountThreshold(),
+                'dispBrightness': self.getDispBrightness(),
+                'zeroValue': self.getZeroValue()}
+
+    def _cacheSetting(self, name, value):
+        if self._settings is not None:
+            self._settings[name] = value
+        return value
+
+    def _dropSetting(self, name):
+        if self._settings:
+            self._settings.pop(name, None)
+
+    def enableInstrumentation(self, before=None, after=None, reservoirSize=10000):
+        """
+        Records call count, error count and latency of every driver function.
+        
+        Args:
+            before(callable) : Called as before(name, args) ahead of every driver call.
+            after(callable) : Called as after(name, args, status, elapsed) after every driver call.
+            reservoirSize(int) : Number of latencies kept per function for the percentiles.
+            
+        Returns:
+            spcnt_instrument.InstrumentedDriver: Also available as self.instrumentation, provides
+            stats(), toJSON() and toPrometheus().
+        """
+        from spcnt_instrument import InstrumentedDriver
+        if self.instrumentation is None:
+            self._bindDriver(InstrumentedDriver(self.dll, before, after, reservoirSize))
+            self.instrumentation = self.dll
+        else:
+            self.instrumentation.before = before
+            self.instrumentation.after = after
+        return self.instrumentation
+
+    def disableInstrumentation(self):
+        """Calls the driver directly again. The collected statistics are discarded."""
+        if self.instrumentation is not None:
+            self._bindDriver(self.instrumentation.driver)
+            self.instrumentation = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: Statistics per driver function, see enableInstrumentation. Empty while disabled.
+        """
+        return self.instrumentation.stats() if self.instrumentation is not None else {}
 
     def __testForError(self, status):
         if status < 0:
@@ -17,8 +331,9 @@ class TLSPCNT:
 
     def __throwError(self, code):
         msg = create_string_buffer(1024)
-        self.dll.TLSPCNT_errorMessage(self.devSession, c_int(code), msg)
-        raise NameError(c_char_p(msg.raw).value)
+        if self.dll.TLSPCNT_errorMessage(self.devSession, ViStatus(code), msg) < 0:
+            msg.value = b''
+        raise errorClass(code)(code, c_char_p(msg.raw).value.decode(errors='replace'))
     
     def conncect_to_first_device(self):
         self.findRsrc()
@@ -32,7 +347,7 @@ class TLSPCNT:
         print('Opened device: %s'%str(RsrcName))
         
 
-    def open(self, resourceName, IDQuery=c_bool(True), resetDevice=c_bool(True)):
+    def open(self, resourceName, IDQuery=True, resetDevice=True):
         """
         This function initializes the instrument driver session and performs the following initialization actions:
         
@@ -47,12 +362,12 @@ class TLSPCNT:
         
         Args:
             resourceName (create_string_buffer)
-            IDQuery (c_bool):This parameter specifies whether an identification query is performed during the initialization process.
+            IDQuery (bool):This parameter specifies whether an identification query is performed during the initialization process.
             
             VI_OFF (0): Skip query.
             VI_ON  (1): Do query (default).
             
-            resetDevice (c_bool):This parameter specifies whether the instrument is reset during the initialization process.
+            resetDevice (bool):This parameter specifies whether the instrument is reset during the initialization process.
             
             VI_OFF (0) - no reset 
             VI_ON  (1) - instrument is reset (default)
@@ -61,8 +376,12 @@ class TLSPCNT:
             int: The return value, 0 is for success
         """
         
-        self.dll.TLSPCNT_close(self.devSession)
-        self.devSession.value = 0
+        if self.devSession.value:
+            self.dll.TLSPCNT_close(self.devSession)
+            self.devSession.value = 0
+        self.invalidateSettings()
+        IDQuery = getattr(IDQuery, 'value', IDQuery)
+        resetDevice = getattr(resetDevice, 'value', resetDevice)
         pInvokeResult = self.dll.TLSPCNT_init(resourceName, IDQuery, resetDevice, byref(self.devSession))
         self.__testForError(pInvokeResult)
         return pInvokeResult
@@ -76,6 +395,8 @@ class TLSPCNT:
             int: The return value, 0 is for success
         """
         pInvokeResult = self.dll.TLSPCNT_close(self.devSession)
+        self.devSession.value = 0
+        self.invalidateSettings()
         return pInvokeResult
 
     def _findRsrc(self, resourceCount):
@@ -127,7 +448,7 @@ class TLSPCNT:
 
     def getRsrcName(self,devInd=0):
         self.resourceName = create_string_buffer(1024)
-        self._getRsrcName(c_int(devInd),self.resourceName)
+        self._getRsrcName(c_uint32(devInd),self.resourceName)
         RsrcName = c_char_p(self.resourceName.raw).value.decode()
         return RsrcName
 
@@ -179,27 +500,72 @@ class TLSPCNT:
         self.modelName = create_string_buffer(1024)
         self.serialNumber = create_string_buffer(1024)
         self.manufacturer = create_string_buffer(1024)
-        self.devAvailable = c_bool()
-        self._getRsrcInfo(c_int16(devInd),self.modelName,self.serialNumber,self.manufacturer,byref(self.devAvailable))
+        self.devAvailable = ViBoolean()
+        self._getRsrcInfo(c_uint32(devInd),self.modelName,self.serialNumber,self.manufacturer,byref(self.devAvailable))
         
         modelName = c_char_p(self.modelName.raw).value.decode()
         serialNumber = c_char_p(self.serialNumber.raw).value.decode()
         manufacturer = c_char_p(self.manufacturer.raw).value.decode()
-        devAvailable = self.devAvailable.value
+        devAvailable = bool(self.devAvailable.value)
         
         return modelName,serialNumber,manufacturer,devAvailable
     
     
-    def writeRegister(self, reg, value):
+    def _writeRegister(self, reg, value):
+        """
+        This function writes the content of any writable instrument register.
+        
+        Args:
+            reg(c_int16) : Register to write, see spcnt_registers.Register.
+            value(c_int16) : Value to write.
+            
+        Returns:
+            int: The return value, 0 is for success
+        """
         pInvokeResult = self.dll.TLSPCNT_writeRegister(self.devSession, reg, value)
         self.__testForError(pInvokeResult)
         return pInvokeResult
 
-    def readRegister(self, reg, value):
+    def writeRegister(self, reg, value):
+        """
+        Args:
+            reg(int) : Register to write, see spcnt_registers.Register.
+            value(int) : Register content 0 .. 0xFFFF.
+        """
+        value = int(value) & 0xFFFF
+        return self._writeRegister(reg, value - 0x10000 if value > 0x7FFF else value)
+
+    def _readRegister(self, reg, value):
+        """
+        This function reads the content of any readable instrument register.
+        
+        Args:
+            reg(c_int16) : Register to read, see spcnt_registers.Register.
+            value(c_int16 use with byref) : Returns the register content.
+            
+        Returns:
+            int: The return value, 0 is for success
+        """
         pInvokeResult = self.dll.TLSPCNT_readRegister(self.devSession, reg, value)
         self.__testForError(pInvokeResult)
         return pInvokeResult
 
+    def readRegister(self, reg, value=None):
+        """
+        Args:
+            reg(int) : Register to read, see spcnt_registers.Register.
+            value(c_int16 use with byref) : Only for compatibility with code that passes its own
+            out-parameter, the status code is returned then.
+            
+        Returns:
+            int: Register content 0 .. 0xFFFF.
+        """
+        if value is not None:
+            return self._readRegister(reg, value)
+        value = c_int16()
+        self._readRegister(reg, byref(value))
+        return value.value & 0xFFFF
+
     def presetRegister(self):
         """
         This function presets all status registers to default.
@@ -208,6 +574,7 @@ class TLSPCNT:
             int: The return value, 0 is for success
         """
         pInvokeResult = self.dll.TLSPCNT_presetRegister(self.devSession)
+        self.invalidateSettings()
         self.__testForError(pInvokeResult)
         return pInvokeResult
 
@@ -231,6 +598,7 @@ class TLSPCNT:
     def setDispBrightness(self,val=0.5):
         dispVal = c_double(val)
         self._setDispBrightness(dispVal)
+        self._cacheSetting('dispBrightness', dispVal.value)
                 
 
     def _getDispBrightness(self, pVal):
@@ -248,9 +616,11 @@ class TLSPCNT:
         return pInvokeResult
 
     def getDispBrightness(self):
+        if self._settings and 'dispBrightness' in self._settings:
+            return self._settings['dispBrightness']
         dispVal = c_double()
         self._getDispBrightness(byref(dispVal))
-        return dispVal.value
+        return self._cacheSetting('dispBrightness', dispVal.value)
 
     def errorMessage(self, statusCode, description):
         """
@@ -308,6 +678,7 @@ class TLSPCNT:
             int: The return value, 0 is for success
         """
         pInvokeResult = self.dll.TLSPCNT_reset(self.devSession)
+        self.invalidateSettings()
         self.__testForError(pInvokeResult)
         return pInvokeResult
 
@@ -420,11 +791,13 @@ class TLSPCNT:
     
     def startZeroing(self):
         pInvokeResult = self.dll.TLSPCNT_startZeroing(self.devSession)
+        self._dropSetting('zeroValue')
         self.__testForError(pInvokeResult)
         return pInvokeResult
     
     def abortZeroing(self):
         pInvokeResult = self.dll.TLSPCNT_abortZeroing(self.devSession)
+        self._dropSetting('zeroValue')
         self.__testForError(pInvokeResult)
         return pInvokeResult
     
@@ -434,9 +807,11 @@ class TLSPCNT:
         return pInvokeResult
     
     def getZeroState(self):
-        state = c_bool()
+        state = ViBoolean()
         self._getZeroState(byref(state))
-        return state.value
+        # zeroing updates the zero value until it has finished
+        self._dropSetting('zeroValue')
+        return bool(state.value)
     
     def _setZeroValue(self,val):
         pInvokeResult = self.dll.TLSPCNT_setZeroValue(self.devSession,val)
@@ -446,15 +821,18 @@ class TLSPCNT:
     def setZeroValue(self,value):
         val = c_double(value)
         self._setZeroValue(val)
+        self._cacheSetting('zeroValue', val.value)
         
     def _getZeroValue(self,val):
         pInvokeResult = self.dll.TLSPCNT_getZeroValue(self.devSession,val)
         self.__testForError(pInvokeResult)
         return pInvokeResult
     def getZeroValue(self):
+        if self._settings and 'zeroValue' in self._settings:
+            return self._settings['zeroValue']
         val = c_double()
         self._getZeroValue(byref(val))
-        return val.value
+        return self._cacheSetting('zeroValue', val.value)
     
     def _getFrequencyCountThreshold(self,val):
         pInvokeResult = self.dll.TLSPCNT_getFrequencyCountThreshold(self.devSession,val)
@@ -462,9 +840,11 @@ class TLSPCNT:
         return pInvokeResult
     
     def getFrequencyCountThreshold(self):
+        if self._settings and 'frequencyCountThreshold' in self._settings:
+            return self._settings['frequencyCountThreshold']
         val = c_uint16()
         self._getFrequencyCountThreshold(byref(val))
-        return val.value
+        return self._cacheSetting('frequencyCountThreshold', val.value)
     
     def _setFrequencyCountThreshold(self,val):
         pInvokeResult = self.dll.TLSPCNT_setFrequencyCountThreshold(self.devSession,val)
@@ -474,6 +854,7 @@ class TLSPCNT:
     def setFrequencyCountThreshold(self,value):
         val = c_uint16(value)
         self._setFrequencyCountThreshold(val)
+        self._cacheSetting('frequencyCountThreshold', val.value)
         
     def startFrequencyCounting(self):
         pInvokeResult = self.dll.TLSPCNT_startFrequencyCounting(self.devSession)
@@ -490,9 +871,9 @@ class TLSPCNT:
         self.__testForError(pInvokeResult)
         return pInvokeResult
     def getFrequencyCountingState(self):
-        val = c_bool()
+        val = ViBoolean()
         self._getFrequencyCountingState(byref(val))
-        return val.value
+        return bool(val.value)
     
     def _setArrayLength(self,val):
         pInvokeResult = self.dll.TLSPCNT_setArrayLenght(self.devSession,val)
@@ -502,6 +883,7 @@ class TLSPCNT:
     def setArrayLength(self,value):
         val = c_uint32(value)
         self._setArrayLength(val)
+        self._cacheSetting('arrayLength', val.value)
         
     def _getArrayLength(self,val):
         pInvokeResult = self.dll.TLSPCNT_getArrayLenght(self.devSession,val)
@@ -509,9 +891,11 @@ class TLSPCNT:
         return pInvokeResult
     
     def getArrayLength(self):
+        if self._settings and 'arrayLength' in self._settings:
+            return self._settings['arrayLength']
         val = c_uint32()
         self._getArrayLength(byref(val))
-        return val.value
+        return self._cacheSetting('arrayLength', val.value)
     
     def _setBinWidth(self,val):
         pInvokeResult = self.dll.TLSPCNT_setBinWidth(self.devSession,val)
@@ -521,6 +905,7 @@ class TLSPCNT:
     def setBinWidth(self,value):
         val = c_uint32(value)
         self._setBinWidth(val)
+        self._cacheSetting('binWidth', val.value)
         return val.value
     
     def _getBinWidth(self,val):
@@ -529,9 +914,11 @@ class TLSPCNT:
         return pInvokeResult
     
     def getBinWidth(self):
+        if self._settings and 'binWidth' in self._settings:
+            return self._settings['binWidth']
         val = c_uint32()
-        self._setBinWidth(byref(val))
-        return val.value
+        self._getBinWidth(byref(val))
+        return self._cacheSetting('binWidth', val.value)
     
     def _setDeadTime(self,val):
         pInvokeResult = self.dll.TLSPCNT_setDeadTime(self.devSession,val)
@@ -541,6 +928,7 @@ class TLSPCNT:
     def setDeadTime(self,value):
         val = c_uint32(value)
         self._setDeadTime(val)
+        self._cacheSetting('deadTime', val.value)
     
     def _getDeadTime(self,val):
         pInvokeResult = self.dll.TLSPCNT_getDeadtime(self.devSession,val)
@@ -548,9 +936,11 @@ class TLSPCNT:
         return pInvokeResult
     
     def getDeadTime(self):
+        if self._settings and 'deadTime' in self._settings:
+            return self._settings['deadTime']
         val = c_uint32()
         self._getDeadTime(byref(val))
-        return val.value
+        return self._cacheSetting('deadTime', val.value)
     
     def _setAverageCount(self,val):
         pInvokeResult = self.dll.TLSPCNT_setAverageCount(self.devSession,val)
@@ -560,6 +950,7 @@ class TLSPCNT:
     def setAverageCount(self,value):
         val = c_uint16(value)
         self._setAverageCount(val)
+        self._cacheSetting('averageCount', val.value)
         
     def _getAverageCount(self,val):
         pInvokeResult = self.dll.TLSPCNT_getAverageCount(self.devSession,val)
@@ -567,9 +958,11 @@ class TLSPCNT:
         return pInvokeResult
     
     def getAverageCount(self):
+        if self._settings and 'averageCount' in self._settings:
+            return self._settings['averageCount']
         val = c_uint16()
         self._getAverageCount(byref(val))
-        return val.value
+        return self._cacheSetting('averageCount', val.value)
     
     def resetStatistics(self):
         pInvokeResult = self.dll.TLSPCNT_resetStatistics(self.devSession)
@@ -582,8 +975,10 @@ class TLSPCNT:
         return pInvokeResult
 
     def getFrequency(self,return_all=False):
-        freq,fmin,fmax,favg = c_double(),c_double(),c_double(),c_double()
-        self._getFrequency(byref(freq), byref(fmin),byref(fmax),byref(favg))
+        pInvokeResult = self._getFrequencyFn(self.devSession, *self._freqRefs)
+        if pInvokeResult < 0:
+            self.__throwError(pInvokeResult)
+        freq,fmin,fmax,favg = self._freq
         if return_all:
             return freq.value, fmin.value, fmax.value, favg.value
         else:
@@ -595,9 +990,10 @@ class TLSPCNT:
         return pInvokeResult
     
     def getCount(self):
-        val = c_int32()
-        self._getCount(byref(val))
-        return val.value
+        pInvokeResult = self._getCountFn(self.devSession, self._countRef)
+        if pInvokeResult < 0:
+            self.__throwError(pInvokeResult)
+        return self._count.value
     
     def _getTime(self,val):
         pInvokeResult = self.dll.TLSPCNT_getTime(self.devSession,val)
@@ -605,16 +1001,43 @@ class TLSPCNT:
         return pInvokeResult
     
     def getTime(self):
-        val = c_double()
-        self._getTime(byref(val))
-        return val.value
+        pInvokeResult = self._getTimeFn(self.devSession, self._timeRef)
+        if pInvokeResult < 0:
+            self.__throwError(pInvokeResult)
+        return self._time.value
     
-    # def _getBins(self,bins,blen):
-    #     pInvokeResult = self.dll.TLSPCNT_getBins(self.devSession,bins,blen)
-    #     self.__testForError(pInvokeResult)
-    #     return pInvokeResult
+    def _getBins(self,bins,blen):
+        """
+        This function reads the bin array of the last measurement.
+        
+        Args:
+            bins(POINTER(c_int32)) : Pointer to an array of at least <Get Array Length> elements that receives the bin counts.
+            blen(c_uint32 use with byref) : Passes the number of elements available in bins and returns the number of bins written.
+            
+        Returns:
+            int: The return value, 0 is for success
+        """
+        pInvokeResult = self.dll.TLSPCNT_getBins(self.devSession,bins,blen)
+        self.__testForError(pInvokeResult)
+        return pInvokeResult
     
-    # def getBins(self):
-    #     bins,blen = c_int32(), c_uint32()
-    #     self._getBins(byref(bins),byref(blen))
-    #     return bins.value, blen.value
+    def getBins(self,out=None):
+        """
+        Reads the bin array straight into a NumPy buffer without per-element conversion.
+        
+        Args:
+            out(np.ndarray) : Optional preallocated, writable, C-contiguous int32 array of at least
+            <Get Array Length> elements. Pass the same array on every call to avoid allocations.
+            When omitted a new array sized from getArrayLength() is allocated.
+            
+        Returns:
+            np.ndarray: View of out holding the bins returned by the device.
+        """
+        import numpy as np
+        if out is None:
+            out = np.empty(self.getArrayLength(), dtype=np.int32)
+        elif out.dtype != np.int32 or out.ndim != 1 or not out.flags.c_contiguous or not out.flags.writeable:
+            raise ValueError('out must be a writable, C-contiguous, 1-D int32 array')
+        blen = c_uint32(out.size)
+        self._getBins(out.ctypes.data_as(POINTER(c_int32)),byref(blen))
+        return out[:min(blen.value,out.size)]
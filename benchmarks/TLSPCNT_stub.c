@@ -0,0 +1,90 @@
+/*
+ * Stand-in for TLSPCNT_64.dll that exports the functions used by TLSPCNT.py and
+ * answers immediately, so the benchmarks measure only the Python/ctypes overhead.
+ *
+ *   cc -O2 -shared -fPIC -o TLSPCNT_64.dll TLSPCNT_stub.c
+ */
+#include <stdint.h>
+#include <string.h>
+
+#ifdef _WIN32
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT __attribute__((visibility("default")))
+#endif
+
+typedef int32_t ViStatus;
+typedef uint32_t ViSession;
+typedef uint16_t ViBoolean;
+
+static uint32_t binWidth = 1, arrayLength = 100, deadTime = 35;
+static uint16_t averageCount = 1, threshold = 1;
+static double brightness = 1.0, zeroValue = 0.0;
+static int32_t counter = 0;
+static double now = 0.0;
+
+static void copyString(char *dst, const char *src) { if (dst) strcpy(dst, src); }
+
+EXPORT ViStatus TLSPCNT_init(const char *rsrc, ViBoolean idq, ViBoolean reset, ViSession *s) { *s = 1; return 0; }
+EXPORT ViStatus TLSPCNT_close(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_findRsrc(ViSession s, uint32_t *n) { *n = 1; return 0; }
+EXPORT ViStatus TLSPCNT_getRsrcName(ViSession s, uint32_t i, char *name) { copyString(name, "USB0::0x1313::0x8089::STUB0001::0::INSTR"); return 0; }
+EXPORT ViStatus TLSPCNT_getRsrcInfo(ViSession s, uint32_t i, char *model, char *serial, char *manufacturer, ViBoolean *available)
+{
+    copyString(model, "SPCNT");
+    copyString(serial, "STUB0001");
+    copyString(manufacturer, "Thorlabs");
+    if (available) *available = 1;
+    return 0;
+}
+EXPORT ViStatus TLSPCNT_writeRegister(ViSession s, int16_t reg, int16_t value) { return 0; }
+EXPORT ViStatus TLSPCNT_readRegister(ViSession s, int16_t reg, int16_t *value) { *value = 0; return 0; }
+EXPORT ViStatus TLSPCNT_presetRegister(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_setDisplayBrightness(ViSession s, double v) { brightness = v; return 0; }
+EXPORT ViStatus TLSPCNT_getDisplayBrightness(ViSession s, double *v) { *v = brightness; return 0; }
+EXPORT ViStatus TLSPCNT_errorMessage(ViSession s, ViStatus code, char *msg) { copyString(msg, "Stub error"); return 0; }
+EXPORT ViStatus TLSPCNT_reset(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_self_test(ViSession s, int16_t *result, char *msg) { *result = 0; copyString(msg, "Self test passed"); return 0; }
+EXPORT ViStatus TLSPCNT_revision_query(ViSession s, char *drv, char *fw) { copyString(drv, "stub"); copyString(fw, "stub"); return 0; }
+EXPORT ViStatus TLSPCNT_identification_query(ViSession s, char *manufacturer, char *name, char *serial)
+{
+    copyString(manufacturer, "Thorlabs");
+    copyString(name, "SPCNT");
+    copyString(serial, "STUB0001");
+    return 0;
+}
+EXPORT ViStatus TLSPCNT_getCalibrationMessage(ViSession s, char *msg) { copyString(msg, ""); return 0; }
+EXPORT ViStatus TLSPCNT_startZeroing(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_abortZeroing(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_getZeroState(ViSession s, ViBoolean *state) { *state = 0; return 0; }
+EXPORT ViStatus TLSPCNT_setZeroValue(ViSession s, double v) { zeroValue = v; return 0; }
+EXPORT ViStatus TLSPCNT_getZeroValue(ViSession s, double *v) { *v = zeroValue; return 0; }
+EXPORT ViStatus TLSPCNT_getFrequencyCountThreshold(ViSession s, uint16_t *v) { *v = threshold; return 0; }
+EXPORT ViStatus TLSPCNT_setFrequencyCountThreshold(ViSession s, uint16_t v) { threshold = v; return 0; }
+EXPORT ViStatus TLSPCNT_startFrequencyCounting(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_stopFrequencyCounting(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_getFrequencyCountingState(ViSession s, ViBoolean *v) { *v = 1; return 0; }
+EXPORT ViStatus TLSPCNT_setArrayLenght(ViSession s, uint32_t v) { arrayLength = v; return 0; }
+EXPORT ViStatus TLSPCNT_getArrayLenght(ViSession s, uint32_t *v) { *v = arrayLength; return 0; }
+EXPORT ViStatus TLSPCNT_setBinWidth(ViSession s, uint32_t v) { binWidth = v; return 0; }
+EXPORT ViStatus TLSPCNT_getBinWidth(ViSession s, uint32_t *v) { *v = binWidth; return 0; }
+EXPORT ViStatus TLSPCNT_setDeadTime(ViSession s, uint32_t v) { deadTime = v; return 0; }
+EXPORT ViStatus TLSPCNT_getDeadtime(ViSession s, uint32_t *v) { *v = deadTime; return 0; }
+EXPORT ViStatus TLSPCNT_setAverageCount(ViSession s, uint16_t v) { averageCount = v; return 0; }
+EXPORT ViStatus TLSPCNT_getAverageCount(ViSession s, uint16_t *v) { *v = averageCount; return 0; }
+EXPORT ViStatus TLSPCNT_resetStatistics(ViSession s) { return 0; }
+EXPORT ViStatus TLSPCNT_getFrequency(ViSession s, double *f, double *fmin, double *fmax, double *favg)
+{
+    *f = *fmin = *fmax = *favg = 1000.0;
+    return 0;
+}
+EXPORT ViStatus TLSPCNT_getCount(ViSession s, int32_t *v) { *v = ++counter; return 0; }
+EXPORT ViStatus TLSPCNT_getTime(ViSession s, double *v) { now += 1e-3; *v = now; return 0; }
+EXPORT ViStatus TLSPCNT_getBins(ViSession s, int32_t *bins, uint32_t *len)
+{
+    uint32_t i, n = *len < arrayLength ? *len : arrayLength;
+    for (i = 0; i < n; i++)
+        bins[i] = (int32_t)i;
+    *len = n;
+    return 0;
+}
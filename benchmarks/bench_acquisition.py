@@ -0,0 +1,151 @@
+"""
+Latency distributions and sustained throughput of the TLSPCNT acquisition calls.
+
+Measures getCount, getFrequency(return_all=True), getTime, bulk bin readout with getBins
+and session open/close against the real driver, the stub library (TLSPCNT_stub.c) or the
+simulator, and writes the results as JSON so runs can be compared across versions.
+
+    python benchmarks/bench_acquisition.py --backend stub -o stub.json
+    python benchmarks/bench_acquisition.py --backend dll --compare stub.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def createDevice(args):
+    if args.backend == 'dll':
+        dev = TLSPCNT() if args.dll_path is None else TLSPCNT(dll_path=args.dll_path)
+    elif args.backend == 'stub':
+        from bench_ctypes import buildStub
+        dev = TLSPCNT(dll_path=buildStub())
+    else:
+        from spcnt_simulator import SimulatedBackend
+        dev = TLSPCNT(backend=SimulatedBackend(latency=args.latency))
+    if args.resource is None:
+        dev.findRsrc()
+        args.resource = dev.getRsrcName(args.index)
+    return dev
+
+
+def measure(fn, calls, warmup):
+    """Per-call latencies in seconds of calls consecutive calls, plus the overall throughput."""
+    for _ in range(warmup):
+        fn()
+    latency = np.empty(calls)
+    clock = time.perf_counter_ns
+    start = clock()
+    for i in range(calls):
+        t0 = clock()
+        fn()
+        latency[i] = clock() - t0
+    elapsed = (clock() - start) * 1e-9
+    return latency * 1e-9, calls / elapsed
+
+
+def summarize(latency, throughput, histogramBins=50):
+    counts, edges = np.histogram(latency, bins=np.geomspace(max(latency.min(), 1e-9), latency.max() * 1.0001, histogramBins + 1))
+    summary = {'calls': int(latency.size), 'throughput': throughput, 'mean': latency.mean(),
+               'std': latency.std(), 'min': latency.min(), 'max': latency.max(),
+               'histogram': {'edges': edges.tolist(), 'counts': counts.tolist()}}
+    for p, v in zip(PERCENTILES, np.percentile(latency, PERCENTILES)):
+        summary['p%g' % p] = v
+    return summary
+
+
+def run(args):
+    dev = createDevice(args)
+    resource = args.resource.encode()
+    dev.open(resource)
+    bins = np.empty(dev.getArrayLength(), dtype=np.int32)
+    benchmarks = {
+        'getCount': dev.getCount,
+        'getFrequency': lambda: dev.getFrequency(return_all=True),
+        'getTime': dev.getTime,
+        'getBins': lambda: dev.getBins(bins),
+    }
+    results = {}
+    for name, fn in benchmarks.items():
+        results[name] = summarize(*measure(fn, args.calls, args.warmup))
+    dev.close()
+
+    def openClose():
+        dev.open(resource, resetDevice=False)
+        dev.close()
+    results['open/close'] = summarize(*measure(openClose, max(args.calls // 100, 10), 1))
+    return {'backend': args.backend, 'resource': args.resource, 'arrayLength': int(bins.size),
+            'version': gitVersion(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'timestamp': time.time(), 'results': results}
+
+
+def gitVersion():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(data):
+    print('%-13s %10s %9s %9s %9s %9s %9s' % ('call', 'calls/s', 'mean[us]', 'p50[us]', 'p90[us]', 'p99[us]', 'max[us]'))
+    for name, r in data['results'].items():
+        print('%-13s %10.0f %9.2f %9.2f %9.2f %9.2f %9.2f' % (
+            name, r['throughput'], r['mean'] * 1e6, r['p50'] * 1e6, r['p90'] * 1e6, r['p99'] * 1e6, r['max'] * 1e6))
+
+
+def compare(data, baseline, tolerance):
+    """Prints the change against a baseline result file. Returns False if a call regressed beyond tolerance."""
+    ok = True
+    print('\n%-13s %12s %12s   (vs %s)' % ('call', 'throughput', 'p99', baseline.get('version')))
+    for name, r in data['results'].items():
+        b = baseline['results'].get(name)
+        if b is None:
+            continue
+        throughput = r['throughput'] / b['throughput']
+        p99 = r['p99'] / b['p99']
+        regressed = throughput < 1 - tolerance or p99 > 1 + tolerance
+        ok &= not regressed
+        print('%-13s %11.2fx %11.2fx %s' % (name, throughput, p99, 'REGRESSION' if regressed else ''))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', choices=('dll', 'stub', 'sim'), default='stub')
+    parser.add_argument('--dll-path', help='directory of TLSPCNT_64.dll for --backend dll')
+    parser.add_argument('--resource', help='resource name to open, default: device --index of findRsrc')
+    parser.add_argument('--index', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='per-call latency of --backend sim in s')
+    parser.add_argument('-n', '--calls', type=int, default=10000, help='measured calls per function')
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('-o', '--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative regression for --compare')
+    args = parser.parse_args(argv)
+
+    data = run(args)
+    report(data)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(data, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-call overhead of the TLSPCNT wrappers against the stub driver in TLSPCNT_stub.c.
+
+"before" replays what the wrappers did without prototypes: dynamic attribute lookup,
+argument type inference and fresh out-parameters on every call. "after" calls the
+TLSPCNT methods, which use the prototyped functions and preallocated out-parameters.
+
+    python benchmarks/bench_ctypes.py [-n CALLS]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+from ctypes import CDLL, byref, c_double, c_int32, c_long
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+
+
+def buildStub(directory=None, cc=os.environ.get('CC', 'cc')):
+    """Compiles TLSPCNT_stub.c into directory/TLSPCNT_64.dll and returns the directory."""
+    directory = directory or tempfile.mkdtemp(prefix='tlspcnt_stub_')
+    subprocess.check_call([cc, '-O2', '-shared', '-fPIC', '-o', os.path.join(directory, 'TLSPCNT_64.dll'),
+                           os.path.join(HERE, 'TLSPCNT_stub.c')])
+    return directory
+
+
+def unprototyped(dll):
+    """The call pattern of the wrappers before the signature table was introduced."""
+    session = c_long(1)
+
+    def testForError(status):
+        if status < 0:
+            raise NameError(status)
+        return status
+
+    def getCount():
+        val = c_int32()
+        testForError(dll.TLSPCNT_getCount(session, byref(val)))
+        return val.value
+
+    def getFrequency():
+        freq, fmin, fmax, favg = c_double(), c_double(), c_double(), c_double()
+        testForError(dll.TLSPCNT_getFrequency(session, byref(freq), byref(fmin), byref(fmax), byref(favg)))
+        return freq.value
+
+    def getTime():
+        val = c_double()
+        testForError(dll.TLSPCNT_getTime(session, byref(val)))
+        return val.value
+
+    return {'getCount': getCount, 'getFrequency': getFrequency, 'getTime': getTime}
+
+
+def perCall(fn, n):
+    return min(timeit.repeat(fn, number=n, repeat=5)) / n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', type=int, default=200000, help='calls per repetition')
+    args = parser.parse_args(argv)
+
+    directory = buildStub()
+    path = os.path.join(directory, 'TLSPCNT_64.dll')
+    before = unprototyped(CDLL(path))
+    dev = TLSPCNT(dll_path=directory)
+    after = {'getCount': dev.getCount, 'getFrequency': dev.getFrequency, 'getTime': dev.getTime}
+
+    print('%-14s %12s %12s %8s' % ('call', 'before [ns]', 'after [ns]', 'speedup'))
+    for name in before:
+        b = perCall(before[name], args.n) * 1e9
+        a = perCall(after[name], args.n) * 1e9
+        print('%-14s %12.0f %12.0f %7.2fx' % (name, b, a, b / a))
+
+
+if __name__ == '__main__':
+    main()
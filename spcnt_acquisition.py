@@ -0,0 +1,224 @@
+"""
+Continuous background acquisition for TLSPCNT sessions.
+
+A single reader thread polls the device at a fixed cadence and appends
+timestamped samples to a preallocated ring buffer. Consumers read snapshots
+from the ring buffer and never touch the driver themselves.
+"""
+import threading
+import time
+
+import numpy as np
+
+SAMPLE_DTYPE = np.dtype([('time', np.float64), ('count', np.int64), ('frequency', np.float64)])
+
+
+class RingBuffer:
+    """
+    Fixed-size ring buffer backed by a preallocated NumPy structured array.
+
+    There is exactly one writer. The writer stores a sample and then publishes it by
+    advancing the head counter, so readers never take a lock: they copy the slots they
+    want and then re-check the head to discard anything the writer overwrote meanwhile.
+
+    Args:
+        capacity(int) : Number of samples kept.
+        dtype(np.dtype) : Structured dtype of one sample.
+        shape(tuple) : Optional per-sample sub-shape, e.g. (arrayLength,) for bin arrays.
+        buffer : Optional object exposing the buffer protocol to place the ring into
+        (e.g. a shared memory segment). See RingBuffer.nbytes for the required size.
+    """
+    def __init__(self, capacity, dtype, shape=(), buffer=None):
+        self.capacity = int(capacity)
+        if self.capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        if buffer is None:
+            self._meta = np.zeros(1, dtype=np.int64)
+            self._data = np.zeros((self.capacity,) + self.shape, dtype=self.dtype)
+        else:
+            self._meta = np.ndarray(1, dtype=np.int64, buffer=buffer)
+            self._data = np.ndarray((self.capacity,) + self.shape, dtype=self.dtype, buffer=buffer, offset=8)
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def nbytes(capacity, dtype, shape=()):
+        """Size in bytes of an external buffer holding a ring with these parameters."""
+        return 8 + int(capacity) * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+
+    @property
+    def head(self):
+        """Total number of samples written since creation."""
+        return int(self._meta[0])
+
+    def append(self, sample):
+        """Writes one sample. Must only be called from the writer thread."""
+        head = int(self._meta[0])
+        self._data[head % self.capacity] = sample
+        self._meta[0] = head + 1
+        with self._cond:
+            self._cond.notify_all()
+
+    def read(self, cursor=0, maxCount=None):
+        """
+        Copies all samples written since cursor.
+
+        Args:
+            cursor(int) : Head value returned by a previous read, 0 for everything still in the buffer.
+            Loss is only counted for cursors returned by a previous read: a reader starting at 0
+            gets the oldest available samples and no loss.
+            maxCount(int) : Optional limit on the number of samples returned (oldest first).
+
+        Returns:
+            (np.ndarray, int, int): the samples, the new cursor and the number of samples
+            lost because the reader fell more than capacity samples behind.
+        """
+        head = self.head
+        start = max(cursor, head - self.capacity)
+        stop = head if maxCount is None else min(head, start + maxCount)
+        out = self._copy(start, stop)
+        # the slot of sample head2 - capacity may be in the middle of being overwritten
+        valid = self.head - self.capacity + 1
+        if valid > start:
+            out = out[valid - start:]
+            start = valid
+        lost = max(start - cursor, 0) if cursor > 0 else 0
+        return out, stop, lost
+
+    def latest(self, n=1):
+        """Returns a copy of the last n samples (fewer if less were written)."""
+        return self.read(max(self.head - n, 0))[0]
+
+    def wait(self, cursor, timeout=None):
+        """Blocks until samples beyond cursor are available. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.head > cursor, timeout)
+
+    def _copy(self, start, stop):
+        n = max(stop - start, 0)
+        i = start % self.capacity
+        if i + n <= self.capacity:
+            return self._data[i:i + n].copy()
+        return np.concatenate((self._data[i:], self._data[:i + n - self.capacity]))
+
+
+class AcquisitionEngine:
+    """
+    Polls a TLSPCNT session on a dedicated thread and stores the samples in a RingBuffer.
+
+    Every sample holds the host timestamp (time.perf_counter seconds) taken right after
+    the reads, the count and, if enabled, the frequency. Bin arrays are kept in a second
+    ring buffer with the same head when bins=True.
+
+    Args:
+        device(TLSPCNT) : Open session, or any object offering getCount/getFrequency/getBins.
+        period(float) : Poll cadence in seconds.
+        capacity(int) : Number of samples kept in the ring buffer.
+        count(bool) : Read getCount() on every poll.
+        frequency(bool) : Read getFrequency() on every poll.
+        bins(bool) : Read getBins() on every poll.
+        lock(threading.Lock) : Optional lock held around the driver calls, for sessions that
+        are also used from other threads.
+        onSample(callable) : Optional callback called on the reader thread with each sample.
+        samples(RingBuffer) : Use this ring buffer of SAMPLE_DTYPE instead of allocating one, capacity is ignored.
+        binSamples(RingBuffer) : Same for the bin arrays, int32 with shape (arrayLength,).
+    """
+    def __init__(self, device, period=1e-3, capacity=100000, count=True, frequency=False, bins=False,
+                 lock=None, onSample=None, samples=None, binSamples=None):
+        self.device = device
+        self.period = period
+        self.readCount = count
+        self.readFrequency = frequency
+        self.readBins = bins
+        self.lock = lock
+        self.onSample = onSample
+        self.samples = samples if samples is not None else RingBuffer(capacity, SAMPLE_DTYPE)
+        self.bins = None
+        if bins:
+            self.bins = binSamples if binSamples is not None else RingBuffer(capacity, np.int32, (device.getArrayLength(),))
+        self.overruns = 0
+        self.errors = 0
+        self.lastError = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='TLSPCNT-acquisition', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def read(self, cursor=0, maxCount=None):
+        """Same as RingBuffer.read on the sample buffer."""
+        return self.samples.read(cursor, maxCount)
+
+    def wait(self, cursor, timeout=None):
+        """Blocks until samples beyond cursor are available. Returns False on timeout or when stopped."""
+        with self.samples._cond:
+            self.samples._cond.wait_for(lambda: self.samples.head > cursor or self._stop.is_set(), timeout)
+        return self.samples.head > cursor
+
+    def _acquire(self, sample, binBuffer):
+        dev = self.device
+        if self.readCount:
+            sample['count'] = dev.getCount()
+        if self.readFrequency:
+            sample['frequency'] = dev.getFrequency()
+        if binBuffer is not None:
+            dev.getBins(binBuffer)
+
+    def _run(self):
+        sample = np.zeros((), dtype=self.samples.dtype)
+        binBuffer = None
+        if self.bins is not None:
+            binBuffer = np.zeros(self.bins.shape, dtype=np.int32)
+        deadline = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                if self.lock is not None:
+                    with self.lock:
+                        self._acquire(sample, binBuffer)
+                else:
+                    self._acquire(sample, binBuffer)
+            except Exception as e:
+                self.errors += 1
+                self.lastError = e
+                self._stop.set()
+                break
+            sample['time'] = time.perf_counter()
+            if binBuffer is not None:
+                self.bins.append(binBuffer)
+            self.samples.append(sample)
+            if self.onSample is not None:
+                self.onSample(sample)
+
+            deadline += self.period
+            now = time.perf_counter()
+            if now > deadline:
+                missed = int((now - deadline) / self.period) + 1 if self.period > 0 else 0
+                self.overruns += missed
+                deadline += missed * self.period
+            else:
+                self._stop.wait(deadline - now)
+        # wake up consumers blocked in wait()
+        with self.samples._cond:
+            self.samples._cond.notify_all()
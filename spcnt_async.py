@@ -0,0 +1,110 @@
+"""
+asyncio front end for TLSPCNT sessions.
+
+Every driver call runs on a single-thread executor owned by the session, so calls to
+one device stay serialized while the event loop keeps running.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from TLSPCNT import TLSPCNT
+from spcnt_zeroing import zero_async
+
+
+class AsyncTLSPCNT:
+    """
+    Awaitable wrapper around a TLSPCNT session.
+
+    The commonly used calls are spelled out below; any other public TLSPCNT method is
+    available as an awaitable through attribute access as well, e.g. await dev.getDeadTime().
+
+    Args:
+        device(TLSPCNT) : Session to wrap. A new TLSPCNT is created from kwargs when omitted.
+    """
+    def __init__(self, device=None, **kwargs):
+        self.device = device if device is not None else TLSPCNT(**kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TLSPCNT')
+        # shared with the zeroing poller, which runs on its own thread
+        self.lock = threading.Lock()
+
+    def _locked(self, fn, *args, **kwargs):
+        with self.lock:
+            return fn(*args, **kwargs)
+
+    async def _call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._locked, fn, *args, **kwargs))
+
+    def __getattr__(self, name):
+        if name == 'device':
+            raise AttributeError(name)
+        attr = getattr(self.device, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self._call(attr, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    async def open(self, resourceName, **kwargs):
+        return await self._call(self.device.open, resourceName, **kwargs)
+
+    async def close(self):
+        return await self._call(self.device.close)
+
+    async def aclose(self):
+        """Closes the device session and shuts the executor down."""
+        try:
+            return await self.close()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def getCount(self):
+        return await self._call(self.device.getCount)
+
+    async def getFrequency(self, return_all=False):
+        return await self._call(self.device.getFrequency, return_all)
+
+    async def getTime(self):
+        return await self._call(self.device.getTime)
+
+    async def getBins(self, out=None):
+        return await self._call(self.device.getBins, out)
+
+    async def startZeroing(self):
+        return await self._call(self.device.startZeroing)
+
+    async def abortZeroing(self):
+        return await self._call(self.device.abortZeroing)
+
+    async def getZeroState(self):
+        return await self._call(self.device.getZeroState)
+
+    async def zero(self, pollInterval=0.1, timeout=None, onMessage=None, **kwargs):
+        """
+        Starts zeroing and waits until the device reports it has finished.
+
+        Runs spcnt_zeroing.zero_async without blocking the event loop. On timeout or
+        cancellation zeroing is aborted.
+
+        Args:
+            pollInterval(float) : Shortest poll interval, the minInterval of zero_async.
+            timeout(float) : Raise TimeoutError after this many seconds, None for no limit.
+            onMessage(callable) : Called as onMessage(device, message) on the polling thread.
+            kwargs : Further arguments of zero_async, e.g. maxInterval.
+
+        Returns:
+            float: The new zero value.
+        """
+        future = zero_async(self.device, timeout, onMessage, minInterval=pollInterval, lock=self.lock, **kwargs)
+        # cancelling the awaiting task cancels the future, which aborts zeroing
+        return await asyncio.wrap_future(future)
@@ -0,0 +1,170 @@
+"""
+Closed-loop auto-ranging of the bin width and the settings that go with it.
+
+AutoRanger keeps the expected counts per bin inside a target window. It switches
+between a ladder of AcquisitionProfiles ordered by bin width, from long bins for low
+flux to short bins for high flux. The count rate is smoothed, ranges are kept with
+hysteresis and a minimum dwell, and the device is only written when the range actually
+changes, through spcnt_profile.apply so only the differing settings are sent.
+
+    ranger = AutoRanger(dev, ladder((1000, 100, 10, 1)), low=20, high=2000)
+    engine = AcquisitionEngine(dev, period=0.01, frequency=True, onSample=ranger.onSample)
+"""
+import math
+import threading
+
+from TLSPCNT import BIN_WIDTH_UNIT, DEAD_TIME_UNIT
+from spcnt_profile import AcquisitionProfile, apply, read_profile
+
+
+def ladder(binWidths=(1000, 100, 10, 1), **settings):
+    """
+    Ranges with the given bin widths (in BIN_WIDTH_UNIT) and otherwise equal settings.
+
+    Args:
+        settings : Further AcquisitionProfile fields set in every range, e.g. averageCount=1.
+    """
+    return [AcquisitionProfile(binWidth=w, **settings) for w in binWidths]
+
+
+class AutoRanger:
+    """
+    Args:
+        device(TLSPCNT) : Open session.
+        ranges(list) : AcquisitionProfiles, each with binWidth set. Default: ladder().
+        low, high(float) : Target window of the counts per bin.
+        hysteresis(float) : A range is kept while its counts per bin are within the window
+        widened by this fraction on both sides.
+        smoothing(float) : Weight of a new rate in the exponential moving average, 1 for none.
+        dwell(int) : Minimum number of updates between two switches.
+        deadTimeLimit(float) : saturated is set when rate * dead time exceeds this fraction.
+        lock(threading.Lock) : Optional lock held while a range is applied.
+        onChange(callable) : Called as onChange(previous, index, rate) after a switch.
+    """
+    def __init__(self, device, ranges=None, low=10.0, high=1000.0, hysteresis=0.2, smoothing=0.3,
+                 dwell=3, deadTimeLimit=0.1, lock=None, onChange=None):
+        ranges = ladder() if ranges is None else list(ranges)
+        if not ranges or any(r.binWidth is None for r in ranges):
+            raise ValueError('Every range needs a binWidth')
+        if not 0 < low < high:
+            raise ValueError('Need 0 < low < high')
+        # longest bins first
+        self.ranges = sorted(ranges, key=lambda r: -r.binWidth)
+        self.device = device
+        self.low = low
+        self.high = high
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self.dwell = dwell
+        self.deadTimeLimit = deadTimeLimit
+        self.lock = lock
+        self.onChange = onChange
+        self.rate = None
+        self.index = None
+        self.switches = 0
+        self.saturated = False
+        self.errors = 0
+        self.lastError = None
+        self._sinceSwitch = 0
+        self._deadTime = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def countsPerBin(self, index=None, rate=None):
+        """Expected counts per bin of a range (default: the current one) at rate (default: the smoothed rate)."""
+        index = self.index if index is None else index
+        rate = self.rate if rate is None else rate
+        return rate * self.ranges[index].binWidth * BIN_WIDTH_UNIT
+
+    def _inWindow(self, index, rate, margin):
+        c = self.countsPerBin(index, rate)
+        return self.low * (1 - margin) <= c <= self.high * (1 + margin)
+
+    def _best(self, rate):
+        # closest to the middle of the window on a log scale
+        middle = math.log(math.sqrt(self.low * self.high))
+        return min(range(len(self.ranges)),
+                   key=lambda i: abs(math.log(max(self.countsPerBin(i, rate), 1e-300)) - middle))
+
+    def select(self, index):
+        """Switches to a range now, regardless of the rate."""
+        if self.lock is not None:
+            with self.lock:
+                apply(self.device, self.ranges[index], verify=False)
+        else:
+            apply(self.device, self.ranges[index], verify=False)
+        if self.ranges[index].deadTime is not None:
+            self._deadTime = self.ranges[index].deadTime * DEAD_TIME_UNIT
+        previous, self.index = self.index, index
+        self._sinceSwitch = 0
+        if previous is not None and previous != index:
+            self.switches += 1
+            if self.onChange is not None:
+                self.onChange(previous, index, self.rate)
+
+    def update(self, rate):
+        """
+        Feeds one count rate measurement in counts/s and switches the range if needed.
+
+        Returns:
+            bool: True if the range was switched.
+        """
+        rate = float(rate)
+        if not math.isfinite(rate) or rate < 0:
+            return False
+        self.rate = rate if self.rate is None else self.rate + self.smoothing * (rate - self.rate)
+        if self._deadTime is None:
+            if self.lock is not None:
+                with self.lock:
+                    deadTime = read_profile(self.device, ['deadTime']).deadTime
+            else:
+                deadTime = read_profile(self.device, ['deadTime']).deadTime
+            self._deadTime = deadTime * DEAD_TIME_UNIT
+        self.saturated = self.rate * self._deadTime > self.deadTimeLimit
+        self._sinceSwitch += 1
+        if self.index is None:
+            self.select(self._best(self.rate))
+            return True
+        if self._sinceSwitch < self.dwell or self._inWindow(self.index, self.rate, self.hysteresis):
+            return False
+        best = self._best(self.rate)
+        if best == self.index:
+            return False
+        self.select(best)
+        return True
+
+    def onSample(self, sample):
+        """AcquisitionEngine onSample callback, uses the frequency of the sample."""
+        self.update(sample['frequency'])
+
+    def step(self):
+        """Reads the rate with getFrequency() and updates."""
+        if self.lock is not None:
+            with self.lock:
+                rate = self.device.getFrequency()
+        else:
+            rate = self.device.getFrequency()
+        return self.update(rate)
+
+    def start(self, interval=0.1):
+        """Runs step() every interval seconds on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='TLSPCNT-autorange', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                self.errors += 1
+                self.lastError = e
+            self._stop.wait(interval)
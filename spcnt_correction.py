@@ -0,0 +1,116 @@
+"""
+Host-side dead-time and dark-count correction of TLSPCNT counts.
+
+All transforms work on whole NumPy arrays, so a bin array from getBins() or a block of
+streamed samples is corrected in a single call. The device parameters are read once
+and cached; call refresh() after changing them on the device.
+"""
+import numpy as np
+
+from TLSPCNT import BIN_WIDTH_UNIT, DEAD_TIME_UNIT
+
+NONPARALYZABLE = 'nonparalyzable'
+PARALYZABLE = 'paralyzable'
+
+
+def nonparalyzable(rate, deadTime, out=None):
+    """
+    True rate n from the observed rate m of a non-paralyzable detector, n = m / (1 - m * tau).
+    Observed rates at or above 1 / tau are saturated and return NaN.
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    if out is None:
+        out = np.empty_like(rate)
+    denominator = np.multiply(rate, -deadTime, out=np.empty_like(rate))
+    denominator += 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(rate, denominator, out=out)
+    out[denominator <= 0] = np.nan
+    return out
+
+
+def paralyzable(rate, deadTime, out=None, maxIter=50, tol=1e-12):
+    """
+    True rate n from the observed rate m of a paralyzable detector, solving m = n * exp(-n * tau)
+    on the low-rate branch (n * tau < 1). Observed rates above 1 / (e * tau) are saturated and return NaN.
+    """
+    if out is None:
+        out = np.empty(np.shape(rate))
+    if deadTime == 0:
+        out[...] = rate
+        return out
+    y = np.array(rate, dtype=np.float64)
+    y *= deadTime
+    saturated = y > np.exp(-1.0)
+    y[saturated] = 0.0
+    # Newton iterations on f(x) = x * exp(-x) - y with x = n * tau. f is concave and
+    # increasing on [0, 1), so starting from x = y the iteration converges from below.
+    x = y.copy()
+    for _ in range(maxIter):
+        e = np.exp(-x)
+        dx = np.asarray((x * e - y) / ((1.0 - x) * e))
+        x -= dx
+        if not np.any(np.abs(dx) > tol * np.maximum(x, tol)):
+            break
+    x[saturated] = np.nan
+    return np.divide(x, deadTime, out=out)
+
+
+class DeadTimeCorrection:
+    """
+    Dead-time and dark-count correction with cached device parameters.
+
+    Args:
+        deadTime(float) : Dead time in seconds.
+        binWidth(float) : Bin width in seconds, used to convert counts per bin into rates.
+        darkRate(float) : Dark count rate in counts/s subtracted after the dead-time correction.
+        model(str) : NONPARALYZABLE or PARALYZABLE.
+    """
+    def __init__(self, deadTime, binWidth, darkRate=0.0, model=NONPARALYZABLE):
+        if model not in (NONPARALYZABLE, PARALYZABLE):
+            raise ValueError('Unknown dead-time model: %s' % model)
+        self.deadTime = deadTime
+        self.binWidth = binWidth
+        self.darkRate = darkRate
+        self.model = model
+        self.subtractDark = True
+        self.device = None
+
+    @classmethod
+    def fromDevice(cls, device, model=NONPARALYZABLE, subtractDark=True):
+        """
+        Reads dead time, bin width and, if subtractDark, the zero value of a TLSPCNT session.
+        The zero value is taken as the dark count rate in counts/s.
+        """
+        corr = cls(0.0, 1.0, model=model)
+        corr.device = device
+        corr.subtractDark = subtractDark
+        corr.refresh()
+        return corr
+
+    def refresh(self):
+        """Re-reads the cached parameters from the device given to fromDevice()."""
+        if self.device is None:
+            return
+        self.deadTime = self.device.getDeadTime() * DEAD_TIME_UNIT
+        self.binWidth = self.device.getBinWidth() * BIN_WIDTH_UNIT
+        self.darkRate = self.device.getZeroValue() if self.subtractDark else 0.0
+
+    def rates(self, rate, out=None):
+        """Corrects observed rates in counts/s, e.g. from getFrequency(). Returns float64 rates."""
+        if self.model == NONPARALYZABLE:
+            out = nonparalyzable(rate, self.deadTime, out)
+        else:
+            out = paralyzable(rate, self.deadTime, out)
+        if self.darkRate:
+            out -= self.darkRate
+        return out
+
+    def counts(self, counts, out=None):
+        """Corrects observed counts per bin, e.g. from getCount() or getBins(). Returns float64 counts."""
+        out = np.divide(counts, self.binWidth, out=out, dtype=np.float64)
+        self.rates(out, out)
+        out *= self.binWidth
+        return out
+
+    __call__ = counts
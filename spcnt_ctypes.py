@@ -0,0 +1,26 @@
+"""
+Argument helpers for Python objects standing in for the driver, e.g. SimulatedBackend and
+ReplayBackend. They are called with the arguments TLSPCNT passes to the DLL functions:
+ctypes scalars, byref() and pointer() out-parameters and string buffers.
+"""
+from ctypes import Array
+
+
+def argValue(arg):
+    """Plain Python value of a ctypes scalar, byref() or bytes argument."""
+    arg = getattr(arg, '_obj', arg)
+    if isinstance(arg, Array):
+        return arg.value
+    return getattr(arg, 'value', arg)
+
+
+def storeArg(arg, value):
+    """Writes value through an out-parameter passed as byref(), pointer() or string buffer."""
+    if arg is None:
+        return
+    if isinstance(arg, Array):
+        arg.value = value.encode()
+    elif hasattr(arg, '_obj'):
+        arg._obj.value = value
+    else:
+        arg.contents.value = value
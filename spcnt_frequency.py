@@ -0,0 +1,234 @@
+"""
+Fixed-cadence frequency stream with incremental statistics on the host.
+
+The statistics are updated sample by sample in constant memory, so mean, variance,
+extrema, Allan deviation and rolling-window values are available live on runs of any
+length, and resetting the statistics of the device does not lose them.
+"""
+import math
+import threading
+
+import numpy as np
+
+from spcnt_acquisition import AcquisitionEngine
+
+
+class RunningStats:
+    """Welford mean and variance plus minimum and maximum."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def updateBlock(self, x):
+        """Adds a whole array of samples (Chan et al. pairwise combination)."""
+        x = np.asarray(x, dtype=np.float64)
+        if not x.size:
+            return
+        n = x.size
+        mean = x.mean()
+        m2 = ((x - mean) ** 2).sum()
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+
+    @property
+    def variance(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+
+class AllanDeviation:
+    """
+    Non-overlapping Allan deviation at several averaging factors, in constant memory.
+
+    For every factor m only the running sum of the current block of m samples, the mean
+    of the previous block and the sum of squared differences of consecutive block means
+    are kept.
+
+    Args:
+        factors(list) : Averaging factors in samples.
+    """
+    def __init__(self, factors):
+        self.factors = np.array(sorted(set(int(m) for m in factors)), dtype=np.int64)
+        if not self.factors.size or self.factors[0] < 1:
+            raise ValueError('factors must be positive')
+        k = self.factors.size
+        self._blockSum = np.zeros(k)
+        self._blockN = np.zeros(k, dtype=np.int64)
+        self._previous = np.full(k, np.nan)
+        self._sumSq = np.zeros(k)
+        self._count = np.zeros(k, dtype=np.int64)
+
+    def update(self, x):
+        self._blockSum += x
+        self._blockN += 1
+        full = self._blockN == self.factors
+        if full.any():
+            self._close(full)
+
+    def _close(self, full):
+        mean = self._blockSum[full] / self.factors[full]
+        previous = self._previous[full]
+        valid = ~np.isnan(previous)
+        sumSq = self._sumSq[full]
+        sumSq[valid] += (mean[valid] - previous[valid]) ** 2
+        self._sumSq[full] = sumSq
+        count = self._count[full]
+        count[valid] += 1
+        self._count[full] = count
+        self._previous[full] = mean
+        self._blockSum[full] = 0.0
+        self._blockN[full] = 0
+
+    def updateBlock(self, x):
+        """Adds a whole array of samples."""
+        x = np.asarray(x, dtype=np.float64)
+        for i, m in enumerate(self.factors):
+            # complete the open block first, then handle whole blocks vectorized
+            need = m - self._blockN[i]
+            head, rest = x[:need], x[need:]
+            self._blockSum[i] += head.sum()
+            self._blockN[i] += head.size
+            if self._blockN[i] < m:
+                continue
+            whole = rest.size // m
+            means = np.empty(whole + 1)
+            means[0] = self._blockSum[i] / m
+            means[1:] = rest[:whole * m].reshape(whole, m).mean(axis=1)
+            if not np.isnan(self._previous[i]):
+                means = np.concatenate(([self._previous[i]], means))
+            diffs = np.diff(means)
+            self._sumSq[i] += (diffs ** 2).sum()
+            self._count[i] += diffs.size
+            self._previous[i] = means[-1]
+            tail = rest[whole * m:]
+            self._blockSum[i] = tail.sum()
+            self._blockN[i] = tail.size
+
+    def deviation(self):
+        """Allan deviation per factor, NaN where fewer than two blocks were completed."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(0.5 * self._sumSq / self._count)
+
+
+class RollingWindow:
+    """The last size samples in a preallocated ring, with running sum and sum of squares."""
+    def __init__(self, size):
+        self.size = int(size)
+        self._data = np.zeros(self.size)
+        self.n = 0
+        self._sum = 0.0
+        self._sumSq = 0.0
+
+    def update(self, x):
+        i = self.n % self.size
+        if self.n >= self.size:
+            old = self._data[i]
+            self._sum -= old
+            self._sumSq -= old * old
+        self._data[i] = x
+        self._sum += x
+        self._sumSq += x * x
+        self.n += 1
+        if self.n % (64 * self.size) == 0:
+            # recompute now and then so rounding errors do not accumulate
+            self._sum = float(self._data.sum())
+            self._sumSq = float((self._data ** 2).sum())
+
+    def stats(self):
+        n = min(self.n, self.size)
+        if not n:
+            return {'n': 0, 'mean': math.nan, 'std': math.nan, 'min': math.nan, 'max': math.nan}
+        mean = self._sum / n
+        var = max(self._sumSq / n - mean * mean, 0.0) * n / (n - 1) if n > 1 else math.nan
+        window = self._data[:n]
+        return {'n': n, 'mean': float(mean), 'std': math.sqrt(var), 'min': float(window.min()), 'max': float(window.max())}
+
+
+class FrequencyStream:
+    """
+    Samples getFrequency() at a fixed cadence and keeps live statistics.
+
+    The raw samples go into the AcquisitionEngine ring buffer (see FrequencyStream.engine),
+    the statistics are updated on the reader thread as each sample arrives.
+
+    Args:
+        device(TLSPCNT) : Open session.
+        period(float) : Sample cadence in seconds, also the base time of the Allan deviation.
+        capacity(int) : Number of raw samples kept in the ring buffer.
+        factors(list) : Allan deviation averaging factors in samples, default powers of two up to 2**16.
+        window(int) : Number of samples of the rolling window.
+    """
+    def __init__(self, device, period=1e-2, capacity=100000, factors=None, window=1000):
+        self.device = device
+        self.period = period
+        if factors is None:
+            factors = [2 ** k for k in range(17)]
+        self.running = RunningStats()
+        self.allan = AllanDeviation(factors)
+        self.window = RollingWindow(window)
+        self._lock = threading.Lock()
+        self.engine = AcquisitionEngine(device, period, capacity, count=False, frequency=True,
+                                        onSample=self._update)
+
+    def _update(self, sample):
+        f = float(sample['frequency'])
+        with self._lock:
+            self.running.update(f)
+            self.allan.update(f)
+            self.window.update(f)
+
+    def start(self):
+        if not self.device.getFrequencyCountingState():
+            self.device.startFrequencyCounting()
+        self.engine.start()
+
+    def stop(self):
+        self.engine.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        """Clears the host statistics; the raw samples in the ring buffer are kept."""
+        with self._lock:
+            self.running = RunningStats()
+            self.allan = AllanDeviation(self.allan.factors)
+            self.window = RollingWindow(self.window.size)
+
+    def stats(self):
+        """
+        Returns:
+            dict: n, mean, std, min, max of all samples, 'allan' mapping tau in seconds to the
+            Allan deviation in Hz, and 'window' with the rolling-window statistics.
+        """
+        with self._lock:
+            r = self.running
+            adev = self.allan.deviation()
+            return {'n': r.n, 'mean': r.mean, 'std': r.std, 'min': r.min, 'max': r.max,
+                    'allan': {float(m * self.period): float(d) for m, d in zip(self.allan.factors, adev)},
+                    'window': self.window.stats()}
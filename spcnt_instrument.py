@@ -0,0 +1,133 @@
+"""
+Per-call instrumentation of the TLSPCNT driver functions.
+
+InstrumentedDriver wraps the driver handle of a TLSPCNT session and times every
+TLSPCNT_* call. Enable it with TLSPCNT.enableInstrumentation(); while it is disabled the
+session calls the driver directly and pays nothing for it.
+"""
+import json
+import threading
+import time
+import numpy as np
+
+from TLSPCNT import rawFunction
+
+PERCENTILES = (50, 90, 99)
+
+
+class FunctionStats:
+    """
+    Call count, error count and latency statistics of one driver function.
+
+    The latencies of the last reservoirSize calls are kept for the percentiles.
+    """
+    def __init__(self, reservoirSize=10000):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self._latency = np.empty(reservoirSize)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, status):
+        with self._lock:
+            self._latency[self.calls % self._latency.size] = elapsed
+            self.calls += 1
+            self.total += elapsed
+            if elapsed < self.min:
+                self.min = elapsed
+            if elapsed > self.max:
+                self.max = elapsed
+            if status < 0:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            latency = self._latency[:min(self.calls, self._latency.size)].copy()
+            snap = {'calls': self.calls, 'errors': self.errors, 'total': self.total,
+                    'mean': self.total / self.calls if self.calls else 0.0,
+                    'min': self.min if self.calls else 0.0, 'max': self.max}
+        values = np.percentile(latency, PERCENTILES) if latency.size else [0.0] * len(PERCENTILES)
+        for p, v in zip(PERCENTILES, values):
+            snap['p%g' % p] = float(v)
+        return snap
+
+
+class InstrumentedDriver:
+    """
+    Driver handle that records every TLSPCNT_* call of the wrapped driver.
+
+    Args:
+        driver : ctypes library or backend object providing the TLSPCNT_* functions.
+        before(callable) : Called as before(name, args) ahead of every driver call.
+        after(callable) : Called as after(name, args, status, elapsed) after every driver call.
+        reservoirSize(int) : Number of latencies kept per function for the percentiles.
+    """
+    def __init__(self, driver, before=None, after=None, reservoirSize=10000):
+        self.driver = driver
+        self.before = before
+        self.after = after
+        self.reservoirSize = reservoirSize
+        self.functions = {}
+
+    def __getattr__(self, name):
+        fn = getattr(self.__dict__['driver'], name)
+        if not name.startswith('TLSPCNT_'):
+            return fn
+        wrapper = self.wrap(name, fn)
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def rawFunction(self, name, restype):
+        """Instrumented counterpart of TLSPCNT.rawFunction, used for the hot-path getters."""
+        return self.wrap(name, rawFunction(self.driver, name, restype))
+
+    def wrap(self, name, fn):
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = FunctionStats(self.reservoirSize)
+        clock = time.perf_counter
+
+        def call(*args):
+            if self.before is not None:
+                self.before(name, args)
+            t0 = clock()
+            status = fn(*args)
+            elapsed = clock() - t0
+            stats.record(elapsed, status)
+            if self.after is not None:
+                self.after(name, args, status, elapsed)
+            return status
+        call.__name__ = name
+        return call
+
+    def reset(self):
+        """Clears all statistics."""
+        for stats in self.functions.values():
+            stats.__init__(self.reservoirSize)
+
+    def stats(self):
+        """Snapshot of the statistics of every function called so far, latencies in seconds."""
+        return {name: stats.snapshot() for name, stats in sorted(self.functions.items()) if stats.calls}
+
+    def toJSON(self, **kwargs):
+        return json.dumps(self.stats(), **kwargs)
+
+    def toPrometheus(self, prefix='tlspcnt_driver'):
+        """The statistics in the Prometheus text exposition format."""
+        stats = self.stats()
+        lines = ['# HELP %s_calls_total Driver calls.' % prefix,
+                 '# TYPE %s_calls_total counter' % prefix]
+        lines += ['%s_calls_total{function="%s"} %d' % (prefix, name, s['calls']) for name, s in stats.items()]
+        lines += ['# HELP %s_errors_total Driver calls that returned an error status.' % prefix,
+                  '# TYPE %s_errors_total counter' % prefix]
+        lines += ['%s_errors_total{function="%s"} %d' % (prefix, name, s['errors']) for name, s in stats.items()]
+        lines += ['# HELP %s_call_seconds Driver call latency.' % prefix,
+                  '# TYPE %s_call_seconds summary' % prefix]
+        for name, s in stats.items():
+            for p in PERCENTILES:
+                lines.append('%s_call_seconds{function="%s",quantile="%g"} %.9g' % (prefix, name, p / 100, s['p%g' % p]))
+            lines.append('%s_call_seconds_sum{function="%s"} %.9g' % (prefix, name, s['total']))
+            lines.append('%s_call_seconds_count{function="%s"} %d' % (prefix, name, s['calls']))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,124 @@
+"""
+Persistent inventory of TLSPCNT devices, keyed by serial number.
+
+Enumerating devices and identifying them costs a session open and several queries per
+device. DeviceInventory keeps the results of getRsrcInfo, identificationQuery and
+revisionQuery in a JSON file and only queries a device again when its resource name or
+model changed, so enumeration and reconnects of known hardware are cheap.
+
+    inventory = DeviceInventory()
+    inventory.scan(dev)
+    inventory.open(dev, 'M00123456')
+"""
+import json
+import os
+import tempfile
+import time
+
+from TLSPCNT import TLSPCNTError
+
+
+def defaultPath():
+    """TLSPCNT_INVENTORY from the environment, default ~/.cache/tlspcnt/inventory.json."""
+    return os.environ.get('TLSPCNT_INVENTORY') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'tlspcnt', 'inventory.json')
+
+
+class DeviceInventory:
+    """
+    Args:
+        path(str) : JSON file of the inventory, see defaultPath. A missing or unreadable file starts an empty inventory.
+    """
+    def __init__(self, path=None):
+        self.path = path or defaultPath()
+        self.devices = {}
+        try:
+            with open(self.path) as f:
+                self.devices = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """Writes the inventory; the file is replaced atomically."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.inventory-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.devices, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def scan(self, device, query=True):
+        """
+        Enumerates the connected devices and updates the inventory.
+
+        Args:
+            device(TLSPCNT) : Session used for the enumeration. It must not be open when query is True.
+            query(bool) : Open new or changed devices to run identificationQuery and revisionQuery.
+            Unchanged devices are never opened.
+
+        Returns:
+            list: Serial numbers of the devices found, in enumeration order.
+        """
+        found = []
+        for index in range(device.findRsrc()):
+            resourceName = device.getRsrcName(index)
+            modelName, serialNumber, manufacturer, available = device.getRsrcInfo(index)
+            found.append(serialNumber)
+            entry = self.devices.get(serialNumber)
+            known = (entry is not None and entry['resourceName'] == resourceName
+                     and entry['modelName'] == modelName and 'identification' in entry)
+            if not known:
+                entry = {'resourceName': resourceName, 'modelName': modelName, 'manufacturer': manufacturer}
+                if query and available:
+                    entry.update(self._query(device, resourceName))
+                self.devices[serialNumber] = entry
+            entry['available'] = available
+            entry['lastSeen'] = time.time()
+        self.save()
+        return found
+
+    @staticmethod
+    def _query(device, resourceName):
+        device.open(resourceName.encode(), resetDevice=False)
+        try:
+            return {'identification': list(device.identificationQuery()),
+                    'revision': list(device.revisionQuery())}
+        finally:
+            device.close()
+
+    def get(self, serialNumber):
+        """The inventory entry of a device: resourceName, modelName, manufacturer, available,
+        lastSeen and, once queried, identification and revision. None for unknown devices."""
+        return self.devices.get(serialNumber)
+
+    def resourceName(self, serialNumber):
+        entry = self.devices.get(serialNumber)
+        return None if entry is None else entry['resourceName']
+
+    def open(self, device, serialNumber, resetDevice=False):
+        """
+        Opens the device with the given serial number.
+
+        The cached resource name is tried first, without enumerating. If that fails the
+        devices are enumerated again and the open is retried once.
+
+        Returns:
+            dict: The inventory entry of the device.
+        """
+        resourceName = self.resourceName(serialNumber)
+        if resourceName is not None:
+            try:
+                device.open(resourceName.encode(), resetDevice=resetDevice)
+                return self.devices[serialNumber]
+            except TLSPCNTError:
+                pass
+        self.scan(device, query=False)
+        resourceName = self.resourceName(serialNumber)
+        if resourceName is None:
+            raise LookupError('Device %s not found' % serialNumber)
+        device.open(resourceName.encode(), resetDevice=resetDevice)
+        return self.devices[serialNumber]
@@ -0,0 +1,238 @@
+"""
+On-line photon statistics of bin streams.
+
+PhotonStatistics consumes bin arrays as they are read from the device and keeps the
+count histogram, Fano factor and the intensity autocorrelation up to maxLag bins. The
+autocorrelation is accumulated block by block with FFTs of a fixed size; only the last
+maxLag bins of the history are kept, so the cost per bin does not grow with the run.
+
+    stats = PhotonStatistics.fromDevice(dev, maxLag=200)
+    engine = AcquisitionEngine(dev, period=0.01, count=False, bins=True)
+    engine.start()
+    stats.follow(engine)
+    ...
+    tau, g2 = stats.g2()
+"""
+import threading
+
+import numpy as np
+
+from TLSPCNT import BIN_WIDTH_UNIT
+
+
+class PhotonStatistics:
+    """
+    Args:
+        maxLag(int) : Largest lag of the autocorrelation in bins.
+        binWidth(float) : Bin width in seconds, used for the lag axis. Lags are in bins when omitted.
+        blockSize(int) : Number of bins per FFT block.
+    """
+    def __init__(self, maxLag=100, binWidth=None, blockSize=4096):
+        self.maxLag = int(maxLag)
+        if self.maxLag < 0:
+            raise ValueError('maxLag must not be negative')
+        self.binWidth = binWidth
+        self.blockSize = int(blockSize)
+        # long enough that neither block nor tail correlations wrap around
+        self._nfft = 1 << int(self.blockSize + 2 * self.maxLag - 1).bit_length()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._followers = []
+        self.reset()
+
+    @classmethod
+    def fromDevice(cls, device, maxLag=100, blockSize=4096):
+        """PhotonStatistics with the bin width of a TLSPCNT session."""
+        return cls(maxLag, device.getBinWidth() * BIN_WIDTH_UNIT, blockSize)
+
+    def reset(self):
+        with self._lock:
+            self._histogram = np.zeros(64, dtype=np.int64)
+            # sum over i of x[i] * x[i + k] and the number of pairs, per lag k
+            self._products = np.zeros(self.maxLag + 1, dtype=np.int64)
+            self._pairs = np.zeros(self.maxLag + 1, dtype=np.int64)
+            self._block = np.empty(self.blockSize, dtype=np.int64)
+            self._fill = 0
+            self._tail = np.empty(0, dtype=np.int64)
+            self._tailProducts = np.zeros(self.maxLag + 1, dtype=np.int64)
+
+    def _correlate(self, x, nfft=None):
+        # the products are integers, rounding removes the FFT error
+        nfft = self._nfft if nfft is None else nfft
+        spectrum = np.fft.rfft(x, nfft)
+        r = np.fft.irfft(spectrum * spectrum.conj(), nfft)[..., :self.maxLag + 1]
+        return np.rint(r).astype(np.int64)
+
+    def _pairCount(self, n):
+        return np.maximum(n - np.arange(self.maxLag + 1), 0)
+
+    def _contribution(self, block):
+        """Products and pairs that block adds after the current tail, and the combined stream."""
+        stream = np.concatenate((self._tail, block))
+        products = self._correlate(stream) - self._tailProducts
+        pairs = self._pairCount(stream.size) - self._pairCount(self._tail.size)
+        return products, pairs, stream
+
+    def _commit(self, block):
+        products, pairs, stream = self._contribution(block)
+        self._products += products
+        self._pairs += pairs
+        self._tail = stream[max(stream.size - self.maxLag, 0):].copy()
+        self._tailProducts = self._correlate(self._tail)
+
+    def update(self, bins):
+        """
+        Adds bins that directly follow the bins added before. 2-d input is taken row by row.
+
+        Args:
+            bins(np.ndarray) : Counts per bin, as returned by getBins.
+        """
+        bins = np.asarray(bins).ravel()
+        if not bins.size:
+            return
+        with self._lock:
+            self._count(bins)
+            i = 0
+            while i < bins.size:
+                n = min(self.blockSize - self._fill, bins.size - i)
+                self._block[self._fill:self._fill + n] = bins[i:i + n]
+                self._fill += n
+                i += n
+                if self._fill == self.blockSize:
+                    self._commit(self._block)
+                    self._fill = 0
+
+    def updateSegments(self, bins):
+        """
+        Adds bin arrays that are separate stretches of the stream, e.g. readouts taken at
+        arbitrary times. No pairs are formed across rows. All rows are correlated in one batch.
+
+        Args:
+            bins(np.ndarray) : 2-d array, one stretch per row.
+        """
+        bins = np.atleast_2d(bins)
+        if not bins.size:
+            return
+        self.discontinuity()
+        with self._lock:
+            self._count(bins.ravel())
+            nfft = 1 << int(bins.shape[1] + self.maxLag - 1).bit_length()
+            self._products += self._correlate(bins.astype(np.int64), nfft).sum(axis=0)
+            self._pairs += bins.shape[0] * self._pairCount(bins.shape[1])
+
+    def _count(self, bins):
+        if bins.min() < 0:
+            raise ValueError('Counts must not be negative')
+        counts = np.bincount(bins)
+        if counts.size > self._histogram.size:
+            self._histogram = np.concatenate((self._histogram, np.zeros(counts.size - self._histogram.size, np.int64)))
+        self._histogram[:counts.size] += counts
+
+    def discontinuity(self):
+        """Marks a gap in the stream: no pairs are formed across it."""
+        with self._lock:
+            if self._fill:
+                self._commit(self._block[:self._fill])
+                self._fill = 0
+            self._tail = self._tail[:0]
+            self._tailProducts = np.zeros_like(self._tailProducts)
+
+    def histogram(self):
+        """Number of bins with k counts, for k = 0 .. the largest count seen."""
+        with self._lock:
+            nonzero = np.flatnonzero(self._histogram)
+            return self._histogram[:nonzero[-1] + 1 if nonzero.size else 1].copy()
+
+    def moments(self):
+        """
+        Returns:
+            (int, float, float): Number of bins, mean and variance of the counts per bin.
+        """
+        h = self.histogram().astype(np.float64)
+        k = np.arange(h.size)
+        n = h.sum()
+        if not n:
+            return 0, np.nan, np.nan
+        mean = (k * h).sum() / n
+        variance = ((k - mean) ** 2 * h).sum() / (n - 1) if n > 1 else np.nan
+        return int(n), mean, variance
+
+    def fano(self):
+        """Fano factor variance / mean of the counts per bin, 1 for Poisson light."""
+        n, mean, variance = self.moments()
+        return variance / mean if mean else np.nan
+
+    def correlation(self):
+        """
+        Mean product of counts k bins apart, including the bins not yet filling a block.
+
+        Returns:
+            (np.ndarray, np.ndarray): Lags (seconds if binWidth is known, else bins) and <x[i] x[i+k]>.
+        """
+        with self._lock:
+            products, pairs = self._products.copy(), self._pairs.copy()
+            if self._fill:
+                p, q, _ = self._contribution(self._block[:self._fill])
+                products += p
+                pairs += q
+        with np.errstate(invalid='ignore', divide='ignore'):
+            c = products / pairs
+        lags = np.arange(self.maxLag + 1)
+        return (lags * self.binWidth if self.binWidth else lags), c
+
+    def g2(self):
+        """
+        Normalized intensity autocorrelation <x[i] x[i+k]> / <x>^2.
+
+        Returns:
+            (np.ndarray, np.ndarray): Lags as in correlation() and g2.
+        """
+        lags, c = self.correlation()
+        _, mean, _ = self.moments()
+        return lags, c / (mean * mean) if mean else np.full_like(c, np.nan)
+
+    def stats(self):
+        n, mean, variance = self.moments()
+        lags, g2 = self.g2()
+        return {'n': n, 'mean': mean, 'variance': variance, 'fano': variance / mean if mean else np.nan,
+                'histogram': self.histogram(), 'lags': lags, 'g2': g2}
+
+    def follow(self, engine, contiguous=False, timeout=0.1):
+        """
+        Feeds the bin arrays an AcquisitionEngine acquires until stop() is called.
+
+        Args:
+            engine(AcquisitionEngine) : Engine created with bins=True.
+            contiguous(bool) : Consecutive bin arrays directly follow each other in time. When False,
+            every array is treated as a separate stretch of the stream. Samples lost by the
+            ring buffer always break the stream.
+        """
+        if engine.bins is None:
+            raise ValueError('The engine does not acquire bins')
+        self._stop.clear()
+        thread = threading.Thread(target=self._follow, args=(engine, contiguous, timeout),
+                                  name='TLSPCNT-photon-statistics', daemon=True)
+        self._followers.append(thread)
+        thread.start()
+        return thread
+
+    def _follow(self, engine, contiguous, timeout):
+        cursor = engine.bins.head
+        while not self._stop.is_set():
+            if not engine.wait(cursor, timeout):
+                if not engine.running:
+                    break
+                continue
+            bins, cursor, lost = engine.bins.read(cursor)
+            if not contiguous:
+                self.updateSegments(bins)
+                continue
+            if lost:
+                self.discontinuity()
+            self.update(bins)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._followers:
+            thread.join()
+        self._followers = []
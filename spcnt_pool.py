@@ -0,0 +1,134 @@
+"""
+Opens every connected TLSPCNT device and reads them in parallel.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from TLSPCNT import TLSPCNT
+
+PoolSample = namedtuple('PoolSample', ['serialNumbers', 'time', 'count', 'frequency'])
+PoolSample.__doc__ = """
+Readings of all devices of a pool, aligned by device index.
+
+    serialNumbers(tuple) : Serial number of each device.
+    time(np.ndarray) : Host time.perf_counter() timestamp of each reading, in the middle of the driver calls.
+    count(np.ndarray) : getCount() of each device.
+    frequency(np.ndarray) : getFrequency() of each device, NaN if not requested.
+"""
+
+
+class TLSPCNTPool:
+    """
+    One session per connected device, keyed by serial number.
+
+    Args:
+        factory(callable) : Returns a new, unopened TLSPCNT. Defaults to TLSPCNT(**kwargs).
+        serialNumbers(list) : Only open these devices. All available devices are opened when omitted.
+        resetDevice(bool) : Passed on to TLSPCNT.open.
+    """
+    def __init__(self, factory=None, serialNumbers=None, resetDevice=True, **kwargs):
+        self.factory = factory if factory is not None else (lambda: TLSPCNT(**kwargs))
+        self.devices = {}
+        self.resourceNames = {}
+        self._executor = None
+        self.open(serialNumbers, resetDevice)
+
+    def enumerate(self, probe=None):
+        """
+        Lists the connected devices.
+
+        Returns:
+            list: (resourceName, modelName, serialNumber, manufacturer, devAvailable) per device.
+        """
+        probe = probe if probe is not None else self.factory()
+        found = []
+        for i in range(probe.findRsrc()):
+            found.append((probe.getRsrcName(i),) + probe.getRsrcInfo(i))
+        return found
+
+    def open(self, serialNumbers=None, resetDevice=True):
+        probe = self.factory()
+        opened = []
+        try:
+            for resourceName, modelName, serialNumber, manufacturer, devAvailable in self.enumerate(probe):
+                if serialNumbers is not None and serialNumber not in serialNumbers:
+                    continue
+                if serialNumber in self.devices or not devAvailable:
+                    continue
+                dev = probe if probe is not None else self.factory()
+                probe = None
+                dev.open(resourceName.encode(), resetDevice=resetDevice)
+                opened.append(serialNumber)
+                self.devices[serialNumber] = dev
+                self.resourceNames[serialNumber] = resourceName
+        except Exception:
+            # do not leak the sessions this call has opened so far
+            for serialNumber in opened:
+                self.resourceNames.pop(serialNumber)
+                try:
+                    self.devices.pop(serialNumber).close()
+                except Exception:
+                    pass
+            raise
+        if serialNumbers is not None:
+            missing = set(serialNumbers) - set(self.devices)
+            if missing:
+                self.close()
+                raise LookupError('Devices not found or not available: %s' % ', '.join(sorted(missing)))
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.devices), 1), thread_name_prefix='TLSPCNTPool')
+
+    def close(self):
+        for dev in self.devices.values():
+            dev.close()
+        self.devices.clear()
+        self.resourceNames.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __getitem__(self, serialNumber):
+        return self.devices[serialNumber]
+
+    @property
+    def serialNumbers(self):
+        return tuple(self.devices)
+
+    def map(self, fn):
+        """Calls fn(device) for every device in parallel and returns the results in serialNumbers order."""
+        return list(self._executor.map(fn, self.devices.values()))
+
+    def read(self, frequency=True):
+        """
+        Reads count and, optionally, frequency of every device in parallel.
+
+        Returns:
+            PoolSample
+        """
+        def readOne(dev):
+            t0 = time.perf_counter()
+            count = dev.getCount()
+            freq = dev.getFrequency() if frequency else np.nan
+            return (t0 + time.perf_counter()) / 2, count, freq
+
+        results = self.map(readOne)
+        n = len(results)
+        sample = PoolSample(self.serialNumbers, np.empty(n), np.empty(n, dtype=np.int64), np.empty(n))
+        for i, (t, count, freq) in enumerate(results):
+            sample.time[i] = t
+            sample.count[i] = count
+            sample.frequency[i] = freq
+        return sample
@@ -0,0 +1,109 @@
+"""
+Acquisition profiles: a whole TLSPCNT configuration applied in one call.
+
+    fast = AcquisitionProfile(binWidth=1, arrayLength=1000, averageCount=1)
+    apply(dev, fast)
+
+apply() compares the profile with the current state of the device and only writes the
+settings that differ, then reads back exactly those settings to verify them. With
+dev.enableSettingsCache() the current state comes from memory, so switching to the
+profile that is already active costs no driver calls at all.
+"""
+import dataclasses
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+# profile field: (getter, setter)
+_SETTINGS = {
+    'binWidth': ('getBinWidth', 'setBinWidth'),
+    'arrayLength': ('getArrayLength', 'setArrayLength'),
+    'deadTime': ('getDeadTime', 'setDeadTime'),
+    'averageCount': ('getAverageCount', 'setAverageCount'),
+    'frequencyCountThreshold': ('getFrequencyCountThreshold', 'setFrequencyCountThreshold'),
+    'zeroValue': ('getZeroValue', 'setZeroValue'),
+}
+
+
+class ProfileError(ValueError):
+    """The device did not accept one or more settings of a profile."""
+    def __init__(self, mismatches):
+        self.mismatches = mismatches
+        super().__init__(mismatches)
+
+    def __str__(self):
+        return 'Settings not applied: ' + ', '.join(
+            '%s=%r (device reports %r)' % (name, wanted, actual) for name, (wanted, actual) in self.mismatches.items())
+
+
+@dataclass
+class AcquisitionProfile:
+    """
+    Device settings of a measurement. Fields left at None are not touched by apply().
+
+    Units are those of the TLSPCNT setters: bin width in BIN_WIDTH_UNIT, dead time in DEAD_TIME_UNIT.
+    """
+    binWidth: Optional[int] = None
+    arrayLength: Optional[int] = None
+    deadTime: Optional[int] = None
+    averageCount: Optional[int] = None
+    frequencyCountThreshold: Optional[int] = None
+    zeroValue: Optional[float] = None
+
+    def settings(self):
+        """The fields that are set, as a dict."""
+        return {k: v for k, v in dataclasses.asdict(self).items() if v is not None}
+
+    def diff(self, current):
+        """Fields of this profile that differ from the profile current."""
+        return {k: v for k, v in self.settings().items() if not _equal(v, getattr(current, k))}
+
+    def merged(self, other):
+        """A copy of this profile with the fields set in other taking precedence."""
+        return dataclasses.replace(self, **other.settings())
+
+
+def _equal(a, b):
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    return a == b
+
+
+def read_profile(device, fields=None):
+    """
+    Reads the settings of a TLSPCNT session. Served from the settings cache when it is enabled.
+
+    Args:
+        fields(list) : Only read these fields, the others are None. Default: all.
+    """
+    fields = _SETTINGS if fields is None else fields
+    return AcquisitionProfile(**{name: getattr(device, _SETTINGS[name][0])() for name in fields})
+
+
+def apply(device, profile, verify=True):
+    """
+    Writes the settings of profile that differ from the device.
+
+    Args:
+        device(TLSPCNT) : Open session.
+        profile(AcquisitionProfile) : Settings to apply.
+        verify(bool) : Read the written settings back from the device and raise ProfileError on a mismatch.
+
+    Returns:
+        dict: The written settings.
+    """
+    current = read_profile(device, profile.settings())
+    changes = profile.diff(current)
+    for name, value in changes.items():
+        getattr(device, _SETTINGS[name][1])(value)
+    if verify and changes:
+        # bypass the settings cache for the read-back
+        device.invalidateSettings(*changes)
+        actual = read_profile(device, changes)
+        mismatches = {name: (value, getattr(actual, name)) for name, value in changes.items()
+                      if not _equal(value, getattr(actual, name))}
+        if mismatches:
+            raise ProfileError(mismatches)
+    return changes
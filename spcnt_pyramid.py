@@ -0,0 +1,195 @@
+"""
+Min/max/mean decimation pyramid for live display of long histories.
+
+Level 0 holds the raw samples, level j holds blocks of 2**j samples with the minimum,
+maximum and mean of the block and its mean time. Every level is a ring of the same
+capacity, so coarse levels reach much further back than fine ones. Samples are folded in
+incrementally: each level keeps at most one block waiting for its partner, and a
+completed pair is passed on to the next level. A plot window is served by slicing the
+finest level that covers it with at most maxPoints blocks.
+
+    pyramid = DecimationPyramid(levels=24, capacity=4096)
+    pyramid.follow(engine, 'count')
+    ...
+    level, rows = pyramid.view(t0, t1, maxPoints=2000)
+    plot(rows['time'], rows['mean']); fill_between(rows['time'], rows['min'], rows['max'])
+"""
+import threading
+
+import numpy as np
+
+LEVEL_DTYPE = np.dtype([('time', np.float64), ('min', np.float64), ('max', np.float64), ('mean', np.float64)])
+
+
+class DecimationPyramid:
+    """
+    Args:
+        levels(int) : Number of levels, the coarsest averages 2**(levels - 1) samples.
+        capacity(int) : Number of blocks kept per level.
+    """
+    def __init__(self, levels=24, capacity=4096):
+        if levels < 1 or capacity < 1:
+            raise ValueError('levels and capacity must be positive')
+        self.levels = int(levels)
+        self.capacity = int(capacity)
+        self._data = [np.zeros(self.capacity, dtype=LEVEL_DTYPE) for _ in range(self.levels)]
+        self._head = [0] * self.levels
+        self._carry = [None] * self.levels
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._followers = []
+
+    def __len__(self):
+        """Number of samples added."""
+        return self._head[0]
+
+    def append(self, t, x):
+        self.extend((t,), (x,))
+
+    def extend(self, t, x):
+        """
+        Adds samples.
+
+        Args:
+            t(np.ndarray) : Sample times, increasing.
+            x(np.ndarray) : Sample values.
+        """
+        t = np.asarray(t, dtype=np.float64).ravel()
+        x = np.asarray(x, dtype=np.float64).ravel()
+        if t.shape != x.shape:
+            raise ValueError('t and x must have the same length')
+        if not t.size:
+            return
+        rows = np.empty(t.size, dtype=LEVEL_DTYPE)
+        rows['time'] = t
+        rows['min'] = rows['max'] = rows['mean'] = x
+        with self._lock:
+            for level in range(self.levels):
+                self._store(level, rows)
+                if level + 1 == self.levels:
+                    break
+                carry = self._carry[level]
+                if carry is not None:
+                    rows = np.concatenate((carry, rows))
+                pairs = rows.size // 2
+                self._carry[level] = rows[2 * pairs:].copy() if rows.size % 2 else None
+                if not pairs:
+                    break
+                a, b = rows[0:2 * pairs:2], rows[1:2 * pairs:2]
+                up = np.empty(pairs, dtype=LEVEL_DTYPE)
+                up['time'] = 0.5 * (a['time'] + b['time'])
+                up['min'] = np.minimum(a['min'], b['min'])
+                up['max'] = np.maximum(a['max'], b['max'])
+                up['mean'] = 0.5 * (a['mean'] + b['mean'])
+                rows = up
+
+    def _store(self, level, rows):
+        data = self._data[level]
+        head = self._head[level]
+        if rows.size > self.capacity:
+            head += rows.size - self.capacity
+            rows = rows[-self.capacity:]
+        i = head % self.capacity
+        n = min(rows.size, self.capacity - i)
+        data[i:i + n] = rows[:n]
+        data[:rows.size - n] = rows[n:]
+        self._head[level] = head + rows.size
+
+    def _segments(self, level):
+        """The blocks of a level oldest first, as one or two contiguous views. Lock must be held."""
+        data, head = self._data[level], self._head[level]
+        if head <= self.capacity:
+            return (data[:head],)
+        i = head % self.capacity
+        return (data[i:], data[:i])
+
+    def _range(self, level, t0, t1):
+        segments = self._segments(level)
+        # every block of the first segment is older than the second one
+        lo = sum(int(np.searchsorted(seg['time'], t0, 'left')) for seg in segments)
+        hi = sum(int(np.searchsorted(seg['time'], t1, 'right')) for seg in segments)
+        return segments, lo, hi
+
+    def span(self, level=0):
+        """(first, last) time held by a level, None if it is empty."""
+        with self._lock:
+            segments = [s for s in self._segments(level) if s.size]
+            if not segments:
+                return None
+            return float(segments[0]['time'][0]), float(segments[-1]['time'][-1])
+
+    def view(self, t0=None, t1=None, maxPoints=2000):
+        """
+        Blocks of the finest level that covers [t0, t1] with at most maxPoints blocks.
+
+        Args:
+            t0, t1(float) : Time window, default everything held by the coarsest level.
+            maxPoints(int) : Upper bound of the number of blocks returned.
+
+        Returns:
+            (int, np.ndarray): The level and a copy of its blocks in the window, LEVEL_DTYPE.
+        """
+        t0 = -np.inf if t0 is None else t0
+        t1 = np.inf if t1 is None else t1
+        with self._lock:
+            for level in range(self.levels):
+                segments, lo, hi = self._range(level, t0, t1)
+                held = sum(s.size for s in segments)
+                if not held:
+                    continue
+                first = segments[0]['time'][0]
+                # the level must reach back to t0, unless no level does
+                covered = first <= t0 or self._head[level] <= self.capacity or level + 1 == self.levels
+                if hi - lo <= maxPoints and covered:
+                    break
+            else:
+                return 0, np.empty(0, dtype=LEVEL_DTYPE)
+            rows = np.concatenate(segments)[lo:hi] if len(segments) > 1 else segments[0][lo:hi].copy()
+            if rows.size > maxPoints:
+                # the coarsest level is still too dense
+                step = -(-rows.size // maxPoints)
+                rows = rows[::step].copy()
+        return level, rows
+
+    def follow(self, engine, field='count', binWidth=None, timeout=0.1):
+        """
+        Feeds samples of an AcquisitionEngine until stop() is called.
+
+        Args:
+            field(str) : 'count', 'frequency' or 'bins'.
+            binWidth(float) : Bin width in seconds, required for 'bins'. The bins of a readout are
+            placed before the time of the readout, so readouts must not overlap in time.
+        """
+        if field == 'bins' and (engine.bins is None or binWidth is None):
+            raise ValueError("field 'bins' needs an engine with bins=True and binWidth")
+        self._stop.clear()
+        thread = threading.Thread(target=self._follow, args=(engine, field, binWidth, timeout),
+                                  name='TLSPCNT-pyramid', daemon=True)
+        self._followers.append(thread)
+        thread.start()
+        return thread
+
+    def _follow(self, engine, field, binWidth, timeout):
+        cursor = engine.samples.head
+        while not self._stop.is_set():
+            if not engine.wait(cursor, timeout):
+                if not engine.running:
+                    break
+                continue
+            samples, newCursor, _ = engine.read(cursor)
+            if field == 'bins':
+                bins, _, _ = engine.bins.read(cursor, newCursor - cursor)
+                n = min(len(bins), len(samples))
+                if n:
+                    bins, t = bins[-n:], samples['time'][-n:]
+                    offsets = (np.arange(bins.shape[1]) - (bins.shape[1] - 1)) * binWidth
+                    self.extend((t[:, None] + offsets).ravel(), bins.ravel())
+            else:
+                self.extend(samples['time'], samples[field])
+            cursor = newCursor
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._followers:
+            thread.join()
+        self._followers = []
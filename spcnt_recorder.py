@@ -0,0 +1,345 @@
+"""
+Streams TLSPCNT data to disk on a background thread.
+
+Counts, frequencies and bin arrays are queued by the acquisition side and appended in
+chunks by a writer thread, either to .npy files in a directory or to an HDF5 file.
+The .npy files stay valid while recording and can be opened at any time with
+load(path), which memory-maps them instead of reading them into RAM.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from TLSPCNT import BIN_WIDTH_UNIT, DEAD_TIME_UNIT
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+COUNT_DTYPE = np.dtype([('time', np.float64), ('count', np.int64)])
+FREQUENCY_DTYPE = np.dtype([('time', np.float64), ('frequency', np.float64), ('min', np.float64),
+                            ('max', np.float64), ('avg', np.float64)])
+BINS_TIME_DTYPE = np.dtype([('time', np.float64)])
+# value of the bins missing from a readout shorter than arrayLength
+BINS_FILL = -1
+# streams that must have the same number of rows, they are written together
+_LINKED = {'bins_time': ('bins_time', 'bins'), 'bins': ('bins_time', 'bins')}
+
+
+class NpyAppender:
+    """
+    Appends rows to a .npy file.
+
+    The header is written with room for any row count and rewritten with the current
+    length on flush(), so the file can be memory-mapped with np.load while it grows.
+    """
+    def __init__(self, path, dtype, shape=()):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.length = 0
+        self._headerSize = len(self._header(2 ** 63 - 1))
+        self._file = open(path, 'wb')
+        self._writeHeader()
+
+    def _header(self, length, size=None):
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+            np.lib.format.dtype_to_descr(self.dtype), (length,) + self.shape)
+        # magic, version 1.0, header length; the total size is padded to a multiple of 64
+        size = size or -(-(10 + len(header) + 1) // 64) * 64
+        header = header.ljust(size - 10 - 1) + '\n'
+        return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+    def _writeHeader(self):
+        pos = self._file.tell()
+        self._file.seek(0)
+        self._file.write(self._header(self.length, self._headerSize))
+        self._file.seek(max(pos, self._headerSize))
+
+    def append(self, rows):
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        if rows.shape[1:] != self.shape:
+            raise ValueError('Rows of shape %r do not fit %s, expected %r' % (rows.shape[1:], self.path, self.shape))
+        self._file.write(rows.data)
+        self.length += len(rows)
+
+    def flush(self):
+        self._writeHeader()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class _NpySink:
+    def __init__(self, path, metadata, binLength):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        self.streams = {
+            'counts': NpyAppender(os.path.join(path, 'counts.npy'), COUNT_DTYPE),
+            'frequency': NpyAppender(os.path.join(path, 'frequency.npy'), FREQUENCY_DTYPE),
+            'bins_time': NpyAppender(os.path.join(path, 'bins_time.npy'), BINS_TIME_DTYPE),
+            'bins': NpyAppender(os.path.join(path, 'bins.npy'), np.int32, (binLength,)),
+        }
+
+    def append(self, name, rows):
+        self.streams[name].append(rows)
+
+    def flush(self):
+        for stream in self.streams.values():
+            stream.flush()
+
+    def close(self):
+        for stream in self.streams.values():
+            stream.close()
+
+
+class _Hdf5Sink:
+    def __init__(self, path, metadata, binLength, chunkSize):
+        if h5py is None:
+            raise ImportError('HDF5 recording requires h5py')
+        self.file = h5py.File(path, 'w')
+        self.file.attrs.update({k: v for k, v in metadata.items()})
+        self.streams = {}
+        for name, dtype, shape in (('counts', COUNT_DTYPE, ()), ('frequency', FREQUENCY_DTYPE, ()),
+                                   ('bins_time', BINS_TIME_DTYPE, ()), ('bins', np.int32, (binLength,))):
+            self.streams[name] = self.file.create_dataset(
+                name, (0,) + shape, dtype=dtype, maxshape=(None,) + shape,
+                chunks=(max(chunkSize // max(int(np.prod(shape)), 1), 1),) + shape)
+
+    def append(self, name, rows):
+        ds = self.streams[name]
+        n = ds.shape[0]
+        ds.resize(n + len(rows), axis=0)
+        ds[n:] = rows
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file.id.valid:
+            self.file.close()
+
+
+def deviceMetadata(device):
+    """Identification, revision and acquisition settings of a TLSPCNT session as a dict."""
+    manufacturer, deviceName, serialNumber = device.identificationQuery()
+    driverRevision, firmwareRevision = device.revisionQuery()
+    return {'manufacturer': manufacturer, 'deviceName': deviceName, 'serialNumber': serialNumber,
+            'driverRevision': driverRevision, 'firmwareRevision': firmwareRevision,
+            'binWidth': device.getBinWidth(), 'binWidthUnit': BIN_WIDTH_UNIT,
+            'deadTime': device.getDeadTime(), 'deadTimeUnit': DEAD_TIME_UNIT,
+            'arrayLength': device.getArrayLength(), 'started': time.time()}
+
+
+def load(path):
+    """Memory-maps a recording written in npy format. Returns a dict of arrays plus 'metadata'."""
+    data = {}
+    for name in ('counts', 'frequency', 'bins_time', 'bins'):
+        data[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+    with open(os.path.join(path, 'metadata.json')) as f:
+        data['metadata'] = json.load(f)
+    return data
+
+
+class Recorder:
+    """
+    Records counts, frequencies and bin arrays of a TLSPCNT session.
+
+    Data is handed over with addCounts/addFrequencies/addBins, or taken from an
+    AcquisitionEngine with follow(), and queued for the writer thread. When the bounded
+    queue is full the data is dropped and counted in dropped, unless block is True.
+    If writing fails the writer stops writing, and the error is raised by the next add*
+    call and by close().
+
+    Args:
+        device(TLSPCNT) : Session the metadata is read from.
+        path(str) : Output directory for format 'npy', output file for format 'hdf5'.
+        format(str) : 'npy' or 'hdf5'.
+        chunkSize(int) : Rows collected per stream before they are written.
+        queueSize(int) : Maximum number of queued blocks.
+        block(bool) : Block the producer instead of dropping data when the queue is full.
+        flushInterval(float) : Seconds between flushes of partially filled chunks.
+    """
+    def __init__(self, device, path, format='npy', chunkSize=65536, queueSize=256, block=False, flushInterval=1.0):
+        self.metadata = deviceMetadata(device)
+        self.path = path
+        self.chunkSize = chunkSize
+        self.block = block
+        self.flushInterval = flushInterval
+        binLength = self._binLength = self.metadata['arrayLength']
+        if format == 'npy':
+            self._sink = _NpySink(path, self.metadata, binLength)
+        elif format == 'hdf5':
+            self._sink = _Hdf5Sink(path, self.metadata, binLength, chunkSize)
+        else:
+            raise ValueError('Unknown format: %s' % format)
+        self._chunks = {'counts': [], 'frequency': [], 'bins_time': [], 'bins': []}
+        self._pending = dict.fromkeys(self._chunks, 0)
+        self._queue = queue.Queue(queueSize)
+        self.dropped = 0
+        self.lost = 0
+        self.lastError = None
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write, name='TLSPCNT-recorder', daemon=True)
+        self._followers = []
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _put(self, blocks):
+        """Queues (stream, rows) blocks as one item, so they are written or dropped together."""
+        if self.lastError is not None:
+            raise self.lastError
+        try:
+            self._queue.put(blocks, block=self.block)
+        except queue.Full:
+            self.dropped += sum(len(rows) for _, rows in blocks)
+
+    @staticmethod
+    def _counts(t, count):
+        rows = np.empty(np.size(t), COUNT_DTYPE)
+        rows['time'] = t
+        rows['count'] = count
+        return [('counts', rows)]
+
+    @staticmethod
+    def _frequencies(t, frequency, fmin=np.nan, fmax=np.nan, favg=np.nan):
+        rows = np.empty(np.size(t), FREQUENCY_DTYPE)
+        rows['time'] = t
+        rows['frequency'] = frequency
+        rows['min'] = fmin
+        rows['max'] = fmax
+        rows['avg'] = favg
+        return [('frequency', rows)]
+
+    def _bins(self, t, bins):
+        bins = np.array(bins, dtype=np.int32, ndmin=2)
+        if bins.ndim != 2 or bins.shape[1] > self._binLength:
+            raise ValueError('Bin arrays must have at most %d bins, got shape %r' % (self._binLength, bins.shape))
+        if bins.shape[1] < self._binLength:
+            # a readout may return fewer bins than arrayLength
+            bins = np.pad(bins, ((0, 0), (0, self._binLength - bins.shape[1])), constant_values=BINS_FILL)
+        rows = np.empty(len(bins), BINS_TIME_DTYPE)
+        rows['time'] = t
+        # bins_time is the timestamp column of bins, the two must stay aligned
+        return [('bins_time', rows), ('bins', bins)]
+
+    def addCounts(self, t, count):
+        """Queues counts with their timestamps, scalars or arrays of equal length."""
+        self._put(self._counts(t, count))
+
+    def addFrequencies(self, t, frequency, fmin=np.nan, fmax=np.nan, favg=np.nan):
+        """Queues frequencies, e.g. from getFrequency(return_all=True), with their timestamps."""
+        self._put(self._frequencies(t, frequency, fmin, fmax, favg))
+
+    def addBins(self, t, bins):
+        """
+        Queues one bin array, or a 2-D stack of them with one timestamp each. Arrays shorter
+        than arrayLength are padded with BINS_FILL.
+        """
+        self._put(self._bins(t, bins))
+
+    def follow(self, engine, timeout=0.1):
+        """Records everything an AcquisitionEngine acquires until the recorder is closed."""
+        thread = threading.Thread(target=self._follow, args=(engine, timeout), name='TLSPCNT-recorder-feed', daemon=True)
+        self._followers.append(thread)
+        thread.start()
+        return thread
+
+    def _follow(self, engine, timeout):
+        cursor = engine.samples.head
+        while True:
+            done = self._stop.is_set() or not engine.running
+            if not done and not engine.wait(cursor, timeout):
+                continue
+            samples, cursor, lost = engine.read(cursor)
+            self.lost += lost
+            if not len(samples):
+                if done:
+                    break
+                continue
+            t = samples['time']
+            # all streams of a readout are queued as one item, they are kept or dropped together
+            blocks = []
+            if engine.readCount:
+                blocks += self._counts(t, samples['count'])
+            if engine.readFrequency:
+                blocks += self._frequencies(t, samples['frequency'])
+            if engine.bins is not None:
+                bins, _, _ = engine.bins.read(cursor - len(samples), len(samples))
+                n = min(len(bins), len(samples))
+                if n:
+                    blocks += self._bins(t[-n:], bins[-n:])
+            if blocks:
+                self._put(blocks)
+
+    def _write(self):
+        lastFlush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flushInterval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if self.lastError is not None:
+                # failed: keep draining the queue so producers and close() do not block
+                continue
+            try:
+                for name, rows in item:
+                    self._chunks[name].append(rows)
+                    self._pending[name] += len(rows)
+                for name, _ in item:
+                    if self._pending[name] >= self.chunkSize:
+                        self._writeChunk(name)
+                if time.monotonic() - lastFlush >= self.flushInterval:
+                    self._flush()
+                    lastFlush = time.monotonic()
+            except Exception as e:
+                self.lastError = e
+        if self.lastError is None:
+            try:
+                self._flush()
+            except Exception as e:
+                self.lastError = e
+
+    def _writeChunk(self, name):
+        names = _LINKED.get(name, (name,))
+        # concatenate everything first, linked streams are appended both or not at all
+        rows = [(n, self._chunks[n][0] if len(self._chunks[n]) == 1 else np.concatenate(self._chunks[n]))
+                for n in names if self._chunks[n]]
+        for n in names:
+            self._chunks[n].clear()
+            self._pending[n] = 0
+        for n, data in rows:
+            self._sink.append(n, data)
+
+    def _flush(self):
+        for name in self._chunks:
+            self._writeChunk(name)
+        self._sink.flush()
+
+    def close(self):
+        """Writes all queued data and closes the files."""
+        self._stop.set()
+        for thread in self._followers:
+            thread.join()
+        self._queue.put(None)
+        self._writer.join()
+        self._sink.close()
+        if self.lastError is not None:
+            raise self.lastError
@@ -0,0 +1,271 @@
+"""
+Status registers of the TLSPCNT and event callbacks on register bit changes.
+
+The register numbers and bits below are an assumption: they follow the generic SCPI
+status model layout of other Thorlabs instrument drivers such as the PM100 (status byte,
+standard event, operation, questionable, measurement and auxiliary register groups with
+condition, event, enable and transition registers). Neither the TLSPCNT driver header nor
+its manual documents them, so check Register, the bit flags and EVENTS against the
+device before relying on them; the simulator implements the same assumed layout.
+Watching a register by its number with RegisterWatcher.on works regardless.
+
+    watcher = RegisterWatcher(dev, interval=0.02, debounce=0.01)
+    watcher.onEvent('zeroingDone', lambda reg, bit, state: print('zeroed'))
+    watcher.onEvent('overflow', lambda reg, bit, state: print('overflow', state))
+    watcher.start()
+"""
+import enum
+import threading
+import time
+
+
+class Register(enum.IntEnum):
+    # assumed layout, see the module docstring
+    STB = 0  # status byte
+    SRE = 1  # service request enable
+    ESR = 2  # standard event status
+    ESE = 3  # standard event enable
+    OPER_COND = 4
+    OPER_EVENT = 5
+    OPER_ENAB = 6
+    OPER_PTR = 7
+    OPER_NTR = 8
+    QUES_COND = 9
+    QUES_EVENT = 10
+    QUES_ENAB = 11
+    QUES_PTR = 12
+    QUES_NTR = 13
+    MEAS_COND = 14
+    MEAS_EVENT = 15
+    MEAS_ENAB = 16
+    MEAS_PTR = 17
+    MEAS_NTR = 18
+    AUX_COND = 19
+    AUX_EVENT = 20
+    AUX_ENAB = 21
+    AUX_PTR = 22
+    AUX_NTR = 23
+
+
+class StatusByte(enum.IntFlag):
+    AUX = 0x01
+    MEAS = 0x02
+    EAV = 0x04  # error available
+    QUES = 0x08
+    MAV = 0x10  # message available
+    ESB = 0x20
+    MSS = 0x40
+    OPER = 0x80
+
+
+class StandardEvent(enum.IntFlag):
+    OPC = 0x01  # operation complete
+    RQC = 0x02
+    QYE = 0x04  # query error
+    DDE = 0x08  # device dependent error
+    EXE = 0x10  # execution error
+    CME = 0x20  # command error
+    URQ = 0x40
+    PON = 0x80  # power on
+
+
+class OperationBit(enum.IntFlag):
+    CALIBRATING = 0x0001  # zeroing in progress
+    SETTLING = 0x0002
+    RANGING = 0x0004
+    SWEEPING = 0x0008
+    MEASURING = 0x0010
+    WAIT_TRIGGER = 0x0020
+    WAIT_ARM = 0x0040
+    CORRECTING = 0x0080
+
+
+class QuestionableBit(enum.IntFlag):
+    TIME = 0x0004
+    POWER = 0x0008
+    TEMPERATURE = 0x0010
+    FREQUENCY = 0x0020
+    CALIBRATION = 0x0100
+
+
+class MeasurementBit(enum.IntFlag):
+    SENSOR = 0x0001  # detector connected
+    DATA_VALID = 0x0002  # new measurement ready
+    ZEROED = 0x0004  # zeroing completed
+    OVERFLOW = 0x0010  # count rate beyond the range of the counter
+
+
+RISING = 'rising'
+FALLING = 'falling'
+BOTH = 'both'
+
+# event name: (register, bit, edge), built on the assumed register layout
+EVENTS = {
+    'overflow': (Register.MEAS_COND, MeasurementBit.OVERFLOW, BOTH),
+    'measurementReady': (Register.MEAS_COND, MeasurementBit.DATA_VALID, RISING),
+    'zeroingDone': (Register.OPER_COND, OperationBit.CALIBRATING, FALLING),
+}
+
+
+def read_registers(device, registers, lock=None):
+    """
+    Reads several registers in one go.
+
+    Args:
+        device(TLSPCNT) : Open session.
+        registers(list) : Register numbers, see Register.
+        lock(threading.Lock) : Optional lock held around all reads.
+
+    Returns:
+        dict: Register to content 0 .. 0xFFFF.
+    """
+    read = device.readRegister
+    if lock is None:
+        return {reg: read(reg) for reg in registers}
+    with lock:
+        return {reg: read(reg) for reg in registers}
+
+
+class _Listener:
+    def __init__(self, register, bits, callback, edge):
+        if edge not in (RISING, FALLING, BOTH):
+            raise ValueError('edge must be RISING, FALLING or BOTH')
+        self.register = Register(register)
+        self.bits = int(bits)
+        self.callback = callback
+        self.edge = edge
+
+    def wants(self, bit, state):
+        return self.bits & bit and (self.edge == BOTH or (self.edge == RISING) == state)
+
+
+class RegisterWatcher:
+    """
+    Polls status registers on a background thread and calls back on bit changes.
+
+    Only the registers that have listeners are read, with one read_registers() call per
+    poll. The first poll only records the initial state. Condition registers report the
+    current state; listen to the event registers to catch changes shorter than the poll
+    interval (reading them clears them).
+
+    Args:
+        device(TLSPCNT) : Open session.
+        interval(float) : Poll interval in seconds.
+        debounce(float) : A bit must keep its new state this many seconds before the change
+        is reported. Changes that revert earlier are ignored.
+        lock(threading.Lock) : Optional lock held around the register reads.
+        onError(callable) : Called with the exception when a poll fails; polling continues.
+    """
+    def __init__(self, device, interval=0.05, debounce=0.0, lock=None, onError=None):
+        self.device = device
+        self.interval = interval
+        self.debounce = debounce
+        self.lock = lock
+        self.onError = onError
+        self.errors = 0
+        self.lastError = None
+        self._listeners = []
+        self._masks = {}
+        self._stable = {}
+        self._pending = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on(self, register, bits, callback, edge=BOTH):
+        """
+        Calls callback(register, bit, state) on the watcher thread when one of bits changes.
+
+        Args:
+            register(Register) : Register to watch.
+            bits(int) : Mask of the bits to watch.
+            callback(callable) : Receives the register, the single bit that changed and its new state (bool).
+            edge(str) : RISING, FALLING or BOTH.
+
+        Returns:
+            Handle for remove().
+        """
+        listener = _Listener(register, bits, callback, edge)
+        self._listeners = self._listeners + [listener]
+        self._masks[listener.register] = self._masks.get(listener.register, 0) | listener.bits
+        return listener
+
+    def onEvent(self, name, callback):
+        """Listens to one of the named EVENTS, e.g. 'overflow', 'measurementReady', 'zeroingDone'."""
+        register, bit, edge = EVENTS[name]
+        return self.on(register, bit, callback, edge)
+
+    def remove(self, listener):
+        self._listeners = [l for l in self._listeners if l is not listener]
+        masks = {}
+        for l in self._listeners:
+            masks[l.register] = masks.get(l.register, 0) | l.bits
+        self._masks = masks
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='TLSPCNT-registers', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def poll(self):
+        """Reads the watched registers once and dispatches the changes. Called by the watcher thread."""
+        masks = self._masks
+        values = read_registers(self.device, list(masks), self.lock)
+        now = time.monotonic()
+        for register, value in values.items():
+            for bit, state in self._changes(register, value, masks[register], now):
+                for listener in self._listeners:
+                    if listener.register == register and listener.wants(bit, state):
+                        listener.callback(register, bit, state)
+
+    def _changes(self, register, value, mask, now):
+        stable = self._stable.get(register)
+        if stable is None:
+            self._stable[register] = value
+            return []
+        changed = (value ^ stable) & mask
+        pending = self._pending.setdefault(register, {})
+        for bit in list(pending):
+            if not changed & bit:
+                # reverted within the debounce time
+                del pending[bit]
+        changes = []
+        while changed:
+            bit = changed & -changed
+            changed ^= bit
+            since = pending.setdefault(bit, now)
+            if now - since >= self.debounce:
+                del pending[bit]
+                stable ^= bit
+                changes.append((bit, bool(value & bit)))
+        self._stable[register] = (stable & mask) | (value & ~mask)
+        return changes
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                self.lastError = e
+                if self.onError is not None:
+                    self.onError(e)
+            self._stop.wait(self.interval)
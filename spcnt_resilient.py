@@ -0,0 +1,190 @@
+"""
+Sessions that survive USB disconnects.
+
+ResilientSession wraps a TLSPCNT session and forwards every method call to it. When a
+call fails with a TransientError (I/O error, timeout, lost connection, invalidated
+session) the device is found again by its serial number, reopened without a reset,
+the last known configuration including the zero value is restored, frequency counting
+is restarted if it was running, and the call is repeated. Every interruption is
+recorded as a Gap, so consumers know which part of the data is missing.
+
+An AcquisitionEngine polling a ResilientSession keeps streaming across reconnects:
+
+    session = ResilientSession(TLSPCNT(), 'M00123456', onGap=print)
+    session.open()
+    engine = AcquisitionEngine(session, period=1e-3, frequency=True)
+    engine.start()
+"""
+import dataclasses
+import threading
+import time
+from collections import namedtuple
+
+from TLSPCNT import TLSPCNTError, TransientError
+from spcnt_profile import _SETTINGS, apply, read_profile
+
+Gap = namedtuple('Gap', 'start end error attempts')
+Gap.__doc__ = """Interruption of a session, start and end in time.perf_counter seconds like the AcquisitionEngine samples."""
+
+_SETTERS = {setter: name for name, (getter, setter) in _SETTINGS.items()}
+_GETTERS = {getter: name for name, (getter, setter) in _SETTINGS.items()}
+
+
+class ResilientSession:
+    """
+    Args:
+        device(TLSPCNT) : Session to wrap, open or not.
+        serialNumber(str) : Serial number of the device, used to find it again.
+        profile(AcquisitionProfile) : Configuration restored after a reconnect. Default: the
+        settings read from the device on open(), updated by every setter and getter called
+        through this session, and with the new zero value when zeroing started through this
+        session finishes.
+        inventory(DeviceInventory) : Optional inventory used to find the device, see spcnt_inventory.
+        timeout(float) : Seconds to keep trying to reconnect before the error is raised, None for no limit.
+        retryInterval(float) : Delay before the second reconnect attempt, doubled after every failed attempt.
+        maxInterval(float) : Upper bound of the delay between attempts.
+        onGap(callable) : Called with the Gap after every successful reconnect.
+    """
+    def __init__(self, device, serialNumber, profile=None, inventory=None, timeout=60.0,
+                 retryInterval=0.1, maxInterval=5.0, onGap=None):
+        self.device = device
+        self.serialNumber = serialNumber
+        self.profile = profile
+        self.inventory = inventory
+        self.timeout = timeout
+        self.retryInterval = retryInterval
+        self.maxInterval = maxInterval
+        self.onGap = onGap
+        self.gaps = []
+        self.frequencyCounting = None
+        self._zeroing = False
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._closed = False
+
+    def open(self, resetDevice=False):
+        """Finds the device by serial number and opens it."""
+        self._closed = False
+        self._connect(resetDevice)
+        if self.profile is None:
+            self.profile = read_profile(self.device)
+        else:
+            apply(self.device, self.profile)
+        if self.frequencyCounting is None:
+            self.frequencyCounting = self.device.getFrequencyCountingState()
+
+    def close(self):
+        """Closes the session; a reconnect in progress gives up."""
+        self._closed = True
+        return self.device.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self, resetDevice=False):
+        if self.inventory is not None:
+            self.inventory.open(self.device, self.serialNumber, resetDevice)
+            return
+        device = self.device
+        for index in range(device.findRsrc()):
+            if device.getRsrcInfo(index)[1] == self.serialNumber:
+                device.open(device.getRsrcName(index).encode(), resetDevice=resetDevice)
+                return
+        raise LookupError('Device %s not found' % self.serialNumber)
+
+    def reconnect(self, error=None):
+        """
+        Reopens the device and restores its configuration, retrying until timeout.
+
+        Args:
+            error(Exception) : The error that made the reconnect necessary, raised when it gives up.
+
+        Returns:
+            Gap: The interruption.
+        """
+        start = time.perf_counter()
+        delay = self.retryInterval
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                self.device.close()
+            except TLSPCNTError:
+                pass
+            try:
+                self._connect()
+                if self.profile is not None:
+                    apply(self.device, self.profile)
+                if self.frequencyCounting and not self.device.getFrequencyCountingState():
+                    self.device.startFrequencyCounting()
+                break
+            except (TLSPCNTError, LookupError) as e:
+                error = e if error is None else error
+                if self._closed or (self.timeout is not None and time.perf_counter() - start + delay > self.timeout):
+                    # give up with the error that started the reconnect
+                    if error is e:
+                        raise
+                    raise error from e
+                time.sleep(delay)
+                delay = min(2 * delay, self.maxInterval)
+        gap = Gap(start, time.perf_counter(), error, attempts)
+        self.gaps.append(gap)
+        if self.onGap is not None:
+            self.onGap(gap)
+        return gap
+
+    def _recover(self, generation, error):
+        with self._lock:
+            # another thread may have reconnected while this one waited for the lock
+            if generation == self._generation:
+                self.reconnect(error)
+                self._generation += 1
+
+    def _setZeroValue(self, value):
+        if self.profile is not None:
+            self.profile = dataclasses.replace(self.profile, zeroValue=value)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        fn = getattr(self.device, name)
+        if not callable(fn):
+            return fn
+        setting = _SETTERS.get(name) or _GETTERS.get(name)
+
+        def call(*args, **kwargs):
+            generation = self._generation
+            try:
+                result = fn(*args, **kwargs)
+            except TransientError as e:
+                if self._closed:
+                    raise
+                self._recover(generation, e)
+                result = fn(*args, **kwargs)
+            if setting is not None and self.profile is not None:
+                if name in _SETTERS:
+                    value = args[0] if args else next(iter(kwargs.values()))
+                    value = getattr(value, 'value', value)
+                else:
+                    value = result
+                self.profile = dataclasses.replace(self.profile, **{setting: value})
+            elif name == 'startFrequencyCounting' or name == 'stopFrequencyCounting':
+                self.frequencyCounting = name == 'startFrequencyCounting'
+            elif name == 'getFrequencyCountingState':
+                self.frequencyCounting = result
+            elif name == 'startZeroing':
+                self._zeroing = True
+                # the old zero value must not be restored while zeroing runs
+                self._setZeroValue(None)
+            elif (name == 'getZeroState' and self._zeroing and not result) or name == 'abortZeroing':
+                self._zeroing = False
+                self._setZeroValue(self.device.getZeroValue())
+            return result
+        call.__name__ = name
+        # cache the wrapper, later calls do not go through __getattr__
+        self.__dict__[name] = call
+        return call
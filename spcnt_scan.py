@@ -0,0 +1,184 @@
+"""
+Pipelined scans: one reduced value per scan point, with configuration and reduction
+overlapping the readout.
+
+For every point the acquisition thread applies the device settings of the point, waits
+for the settle time and reads perPointSamples samples into one of two raw buffers. As
+soon as the readout of point k is done, the reduction of point k and the stage callback
+of point k+1 run on their own threads, so the counter is only idle while the stage moves
+and settles.
+
+    def moveStage(x):
+        stage.moveTo(x)
+
+    result = scan(dev, np.linspace(0, 10, 10001), 100, moveStage, read='count', settle=1e-3)
+    print(result.summary())
+    plot(result.points, result.data)
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from spcnt_profile import AcquisitionProfile, apply
+
+TIMING_DTYPE = np.dtype([('start', np.float64), ('configure', np.float64), ('wait', np.float64),
+                         ('buffer', np.float64), ('apply', np.float64), ('settle', np.float64), ('acquire', np.float64),
+                         ('reduce', np.float64)])
+
+
+class ScanResult:
+    """
+    Attributes:
+        points(list) : The scan points.
+        data(np.ndarray) : Reduced value per point, data[k] belongs to points[k].
+        timing(np.ndarray) : TIMING_DTYPE record per point, in seconds. start is relative to the
+        start of the scan; configure and reduce ran concurrently with the acquisition, wait is the
+        time the acquisition waited for configure to finish and buffer the time it waited for the
+        reduction of point k - 2 to release the raw buffer.
+        elapsed(float) : Wall-clock duration of the scan in seconds.
+    """
+    def __init__(self, points, data, timing, elapsed):
+        self.points = points
+        self.data = data
+        self.timing = timing
+        self.elapsed = elapsed
+
+    def summary(self):
+        """Totals and per-point means of the timing; dutyCycle is the fraction of the scan spent reading the device."""
+        n = len(self.timing)
+        acquire = float(self.timing['acquire'].sum())
+        summary = {'points': n, 'elapsed': self.elapsed, 'dutyCycle': acquire / self.elapsed if self.elapsed else 0.0,
+                   'overheadPerPoint': (self.elapsed - acquire) / n if n else 0.0}
+        for name in TIMING_DTYPE.names[1:]:
+            summary[name] = float(self.timing[name].mean()) if n else 0.0
+        return summary
+
+
+def _reader(device, read, perPointSamples):
+    """A function filling a raw buffer with the samples of one point, and the buffer."""
+    if read == 'bins':
+        getBins = device.getBins
+
+        def acquireBins(buffer):
+            for row in buffer:
+                getBins(row)
+        return acquireBins, np.empty((perPointSamples, device.getArrayLength()), np.int32)
+    if read == 'count':
+        fn, dtype = device.getCount, np.int64
+    elif read == 'frequency':
+        fn, dtype = device.getFrequency, np.float64
+    elif callable(read):
+        fn, dtype = (lambda: read(device)), np.float64
+    else:
+        raise ValueError("read must be 'count', 'frequency', 'bins' or a callable")
+
+    def acquire(buffer):
+        for i in range(perPointSamples):
+            buffer[i] = fn()
+    return acquire, np.empty(perPointSamples, dtype)
+
+
+def scan(device, points, perPointSamples, configure=None, read='count', reduce=None, settle=0.0,
+         lookahead=0, lock=None, onPoint=None, out=None):
+    """
+    Runs a scan.
+
+    Args:
+        device(TLSPCNT) : Open session.
+        points(list) : Scan points, passed to configure.
+        perPointSamples(int) : Number of reads per point.
+        configure(callable) : configure(point) moves the stage etc. It runs on its own thread and may
+        return an AcquisitionProfile with the device settings of the point; only the settings that
+        differ from the previous point are written.
+        read : 'count', 'frequency', 'bins' or a callable read(device) returning a number.
+        reduce(callable) : Reduces the raw samples of a point, an array with perPointSamples rows,
+        to the result of the point. Default: mean over the samples.
+        settle(float) : Seconds to wait between configure/apply and the readout.
+        lookahead(int) : Number of points configure may run ahead of the readout. 0 starts
+        configure(points[k + 1]) once point k has been read, as needed when configure moves
+        something the measurement depends on. 1 runs it concurrently with the readout of point k.
+        lock(threading.Lock) : Optional lock held around the driver calls of a point.
+        onPoint(callable) : Called as onPoint(k, point, value) on the reduction thread.
+        out(np.ndarray) : Preallocated result with one row per point. Default: float64 of shape
+        (len(points),), or (len(points), arrayLength) for read='bins'. Pass it when reduce returns
+        another shape or type.
+
+    Returns:
+        ScanResult
+    """
+    points = list(points)
+    n = len(points)
+    acquire, raw = _reader(device, read, perPointSamples)
+    buffers = (raw, raw.copy())
+    reduce = (lambda x: x.mean(axis=0)) if reduce is None else reduce
+    timing = np.zeros(n, dtype=TIMING_DTYPE)
+    if out is None:
+        out = np.empty((n,) + raw.shape[1:], dtype=np.float64)
+    elif len(out) != n:
+        raise ValueError('out must have one row per point')
+
+    def configureAt(k):
+        t0 = time.perf_counter()
+        profile = configure(points[k]) if configure is not None else None
+        timing['configure'][k] = time.perf_counter() - t0
+        return profile
+
+    def reduceAt(k, buffer):
+        t0 = time.perf_counter()
+        value = reduce(buffer)
+        out[k] = value
+        timing['reduce'][k] = time.perf_counter() - t0
+        if onPoint is not None:
+            onPoint(k, points[k], value)
+
+    stage = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TLSPCNT-scan-configure')
+    reducer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TLSPCNT-scan-reduce')
+    configured = {}
+    reduced = [None] * n
+
+    def submit(k):
+        if k < n:
+            configured[k] = stage.submit(configureAt, k)
+
+    start = time.perf_counter()
+    try:
+        for k in range(min(lookahead + 1, n)):
+            submit(k)
+        for k in range(n):
+            t0 = time.perf_counter()
+            timing['start'][k] = t0 - start
+            profile = configured.pop(k).result()
+            t1 = time.perf_counter()
+            timing['wait'][k] = t1 - t0
+            buffer = buffers[k % 2]
+            if k >= 2:
+                # the reduction of point k - 2 still uses this buffer
+                reduced[k - 2].result()
+                t = time.perf_counter()
+                timing['buffer'][k] = t - t1
+                t1 = t
+            if lock is not None:
+                lock.acquire()
+            try:
+                if isinstance(profile, AcquisitionProfile):
+                    apply(device, profile, verify=False)
+                t2 = time.perf_counter()
+                timing['apply'][k] = t2 - t1
+                if settle:
+                    time.sleep(settle)
+                t3 = time.perf_counter()
+                timing['settle'][k] = t3 - t2
+                acquire(buffer)
+                timing['acquire'][k] = time.perf_counter() - t3
+            finally:
+                if lock is not None:
+                    lock.release()
+            submit(k + 1 + lookahead)
+            reduced[k] = reducer.submit(reduceAt, k, buffer)
+        for future in reduced:
+            future.result()
+    finally:
+        stage.shutdown(wait=True, cancel_futures=True)
+        reducer.shutdown(wait=True, cancel_futures=True)
+    return ScanResult(points, out, timing, time.perf_counter() - start)
@@ -0,0 +1,253 @@
+"""
+Acquisition server: one process owns the TLSPCNT session, any number of local processes read.
+
+The server acquires continuously with an AcquisitionEngine whose ring buffers live in
+multiprocessing.shared_memory segments. Clients map those segments and read samples
+without copying them through the server, and send setter/getter commands over a local
+multiprocessing.connection channel.
+
+    # owner process
+    server = AcquisitionServer(dev, address=('localhost', 6000), frequency=True)
+    server.start()
+    # hand server.authkey to the clients, e.g. through a file only the user can read
+
+    # any other process
+    client = AcquisitionClient(('localhost', 6000), authkey=authkey)
+    client.setBinWidth(10)
+    reader = client.reader()
+    samples, cursor, lost = reader.read()
+"""
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import AuthenticationError, Client, Listener, answer_challenge, deliver_challenge
+
+import numpy as np
+
+from spcnt_acquisition import SAMPLE_DTYPE, AcquisitionEngine, RingBuffer
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # the segment belongs to the server; keep the resource tracker of this process from unlinking it
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except (ImportError, AttributeError, KeyError):
+        pass
+    return shm
+
+
+def _release(ring):
+    # the NumPy views must be gone before the segment can be closed
+    ring._meta = ring._data = None
+
+
+class AcquisitionServer:
+    """
+    Owns a TLSPCNT session, acquires into shared memory and serves driver calls.
+
+    Args:
+        device(TLSPCNT) : Open session.
+        address : Address of the control channel as accepted by multiprocessing.connection.Listener,
+        e.g. ('localhost', 6000) or a Unix socket path. A free local address is picked when omitted.
+        authkey(bytes) : Authentication key clients must present. A random key is generated when
+        omitted, see the authkey attribute. Requests are unpickled, so the channel must never
+        accept unauthenticated connections.
+        period, capacity, count, frequency, bins : Passed on to AcquisitionEngine.
+    """
+    def __init__(self, device, address=None, authkey=None, period=1e-3, capacity=100000,
+                 count=True, frequency=False, bins=False):
+        self.device = device
+        self.authkey = os.urandom(32) if authkey is None else bytes(authkey)
+        if not self.authkey:
+            raise ValueError('authkey must not be empty')
+        self.lock = threading.RLock()
+        self._segments = []
+        samples = self._ring(capacity, SAMPLE_DTYPE)
+        binSamples = self._ring(capacity, np.int32, (device.getArrayLength(),)) if bins else None
+        self.engine = AcquisitionEngine(device, period, capacity, count, frequency, bins,
+                                        lock=self.lock, samples=samples, binSamples=binSamples)
+        # authentication runs on the connection threads, see _serve
+        self.listener = Listener(address)
+        self.address = self.listener.address
+        self._threads = []
+        self._closed = False
+
+    def _ring(self, capacity, dtype, shape=()):
+        shm = shared_memory.SharedMemory(create=True, size=RingBuffer.nbytes(capacity, dtype, shape))
+        ring = RingBuffer(capacity, dtype, shape, buffer=shm.buf)
+        self._segments.append((shm, ring))
+        return ring
+
+    def info(self):
+        """Everything a client needs to map the ring buffers."""
+        rings = {'samples': (self._segments[0][0].name, self.engine.samples)}
+        if self.engine.bins is not None:
+            rings['bins'] = (self._segments[1][0].name, self.engine.bins)
+        return {name: {'shm': shm, 'capacity': ring.capacity, 'dtype': ring.dtype, 'shape': ring.shape}
+                for name, (shm, ring) in rings.items()}
+
+    def start(self):
+        self.engine.start()
+        thread = threading.Thread(target=self._accept, name='TLSPCNT-server', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def serveForever(self):
+        self.start()
+        try:
+            while not self._closed:
+                time.sleep(0.5)
+        finally:
+            self.close()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
+            thread = threading.Thread(target=self._serve, args=(conn,), name='TLSPCNT-client', daemon=True)
+            thread.start()
+
+    def _serve(self, conn):
+        with conn:
+            # here rather than in Listener.accept, where a client that never answers would block the others
+            try:
+                deliver_challenge(conn, self.authkey)
+                answer_challenge(conn, self.authkey)
+            except (AuthenticationError, EOFError, OSError):
+                return
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(('ok', self._handle(*request)))
+                except Exception as e:
+                    conn.send(('error', e))
+
+    def _handle(self, command, name=None, args=(), kwargs=None):
+        if command == 'info':
+            return self.info()
+        if command == 'stats':
+            return {'head': self.engine.samples.head, 'overruns': self.engine.overruns,
+                    'errors': self.engine.errors, 'running': self.engine.running}
+        if command != 'call' or name.startswith('_') or not callable(getattr(self.device, name, None)):
+            raise AttributeError('Unknown command: %s %s' % (command, name))
+        with self.lock:
+            return getattr(self.device, name)(*args, **(kwargs or {}))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.engine.stop()
+        self.listener.close()
+        for shm, ring in self._segments:
+            _release(ring)
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedRingReader:
+    """
+    Read access to a ring buffer of an AcquisitionServer from another process.
+
+    read() and latest() behave like the RingBuffer methods. wait() polls the head.
+    """
+    def __init__(self, spec):
+        self._shm = _attach(spec['shm'])
+        self.ring = RingBuffer(spec['capacity'], spec['dtype'], spec['shape'], buffer=self._shm.buf)
+
+    @property
+    def head(self):
+        return self.ring.head
+
+    def read(self, cursor=0, maxCount=None):
+        return self.ring.read(cursor, maxCount)
+
+    def latest(self, n=1):
+        return self.ring.latest(n)
+
+    def wait(self, cursor, timeout=None, pollInterval=1e-3):
+        end = None if timeout is None else time.monotonic() + timeout
+        while self.ring.head <= cursor:
+            if end is not None and time.monotonic() >= end:
+                return False
+            time.sleep(pollInterval)
+        return True
+
+    def close(self):
+        _release(self.ring)
+        self._shm.close()
+
+
+class AcquisitionClient:
+    """
+    Connection to an AcquisitionServer. Public TLSPCNT methods can be called directly on it,
+    they are executed by the server process.
+
+    Args:
+        address : Address of the server.
+        authkey(bytes) : The authkey of the server.
+    """
+    def __init__(self, address, authkey):
+        self._conn = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self._readers = []
+
+    def _request(self, *request):
+        with self._lock:
+            self._conn.send(request)
+            status, result = self._conn.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def call(self, name, *args, **kwargs):
+        return self._request('call', name, args, kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def info(self):
+        return self._request('info')
+
+    def stats(self):
+        """Head, overrun and error counters of the acquisition engine of the server."""
+        return self._request('stats')
+
+    def reader(self, ring='samples'):
+        """Maps the 'samples' or 'bins' ring buffer of the server into this process."""
+        reader = SharedRingReader(self.info()[ring])
+        self._readers.append(reader)
+        return reader
+
+    def close(self):
+        for reader in self._readers:
+            reader.close()
+        self._readers = []
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
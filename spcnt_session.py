@@ -0,0 +1,216 @@
+"""
+Thread-safe facade for a TLSPCNT session shared by several consumers.
+
+All driver calls of a SharedSession run on one scheduler thread, taken from a priority
+queue: writes (setters, zeroing, reset, ...) first, then foreground reads, then
+background polls. Identical reads are coalesced: a read that is already queued or
+running is joined instead of issued again, a queued read joined at a higher priority is
+moved up to that priority, and with a freshness window a result that
+completed less than freshness seconds ago is handed out directly. Every consumer of a
+coalesced read receives the same result object.
+
+    shared = SharedSession(dev, freshness=0.005)
+    shared.getCount()                 # GUI thread
+    shared.background.getFrequency()  # logger thread
+    shared.setBinWidth(10)            # feedback loop, runs before queued reads
+
+Calls returned to the caller in order are executed in order. Requests submitted
+without waiting may be reordered by priority, so a read submitted before a write can
+observe the write.
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+WRITE = 0
+FOREGROUND = 1
+BACKGROUND = 2
+
+_READ_PREFIXES = ('get', 'read')
+_READS = frozenset(('findRsrc', 'identificationQuery', 'revisionQuery', 'refresh', 'stats'))
+
+
+def isRead(name):
+    """True for TLSPCNT methods that only query the device."""
+    return name.startswith(_READ_PREFIXES) or name in _READS
+
+
+class _Priority:
+    """Proxy issuing every call of a SharedSession at one priority."""
+    def __init__(self, session, priority):
+        self._session = session
+        self._priority = priority
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        session, priority = self._session, self._priority
+
+        def call(*args, **kwargs):
+            return session.submit(name, args, kwargs, priority).result()
+        call.__name__ = name
+        self.__dict__[name] = call
+        return call
+
+
+class SharedSession:
+    """
+    Args:
+        device(TLSPCNT) : Session to share. It must not be used directly while shared.
+        freshness(float) : Seconds a read result may be reused for identical reads. 0 only joins
+        reads that are queued or running.
+
+    Attributes:
+        requests(int) : Calls requested by consumers.
+        driverCalls(int) : Calls executed on the device.
+        coalesced(int) : Reads that joined a queued or running identical read.
+        reused(int) : Reads answered from the freshness window.
+    """
+    def __init__(self, device, freshness=0.0):
+        self.device = device
+        self.freshness = freshness
+        self.requests = 0
+        self.driverCalls = 0
+        self.coalesced = 0
+        self.reused = 0
+        self.background = _Priority(self, BACKGROUND)
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = {}
+        self._generation = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='TLSPCNT-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, name, args=(), kwargs=None, priority=None):
+        """
+        Queues a call of a TLSPCNT method.
+
+        Args:
+            name(str) : Method name.
+            priority(int) : WRITE, FOREGROUND or BACKGROUND. Default: WRITE for writes, FOREGROUND for reads.
+
+        Returns:
+            concurrent.futures.Future: The result of the call, shared with coalesced callers.
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+        kwargs = kwargs or {}
+        read = isRead(name)
+        if priority is None:
+            priority = FOREGROUND if read else WRITE
+        key = None
+        if read:
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                # e.g. getBins(out): cannot be shared
+                key = None
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('SharedSession is closed')
+            self.requests += 1
+            if key is not None:
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    future, queued, request = inflight
+                    if priority < queued and not future.running():
+                        # queue it again at the higher priority, _run skips the later entry
+                        self._inflight[key] = (future, priority, request)
+                        self._queue.put((priority, next(self._order), request))
+                    self.coalesced += 1
+                    return future
+                cached = self._results.get(key)
+                if cached is not None and time.monotonic() - cached[0] <= self.freshness:
+                    self.reused += 1
+                    return cached[1]
+            else:
+                if not read:
+                    # results of earlier reads may not reflect this write
+                    self._generation += 1
+                    self._inflight.clear()
+                    self._results.clear()
+            future = Future()
+            request = (future, name, args, kwargs, key, self._generation)
+            if key is not None:
+                self._inflight[key] = (future, priority, request)
+            self._queue.put((priority, next(self._order), request))
+        return future
+
+    def call(self, name, *args, **kwargs):
+        """Calls a TLSPCNT method at its default priority and waits for the result."""
+        return self.submit(name, args, kwargs).result()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if not callable(getattr(self.device, name, None)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.submit(name, args, kwargs).result()
+        call.__name__ = name
+        # cache the wrapper, later calls do not go through __getattr__
+        self.__dict__[name] = call
+        return call
+
+    def _run(self):
+        while True:
+            _, _, request = self._queue.get()
+            if request is None:
+                break
+            future, name, args, kwargs, key, generation = request
+            if future.running() or future.done():
+                # already run from an entry at a higher priority
+                continue
+            if not future.set_running_or_notify_cancel():
+                self._forget(key, future)
+                continue
+            self.driverCalls += 1
+            try:
+                result = getattr(self.device, name)(*args, **kwargs)
+            except BaseException as e:
+                self._forget(key, future)
+                future.set_exception(e)
+                continue
+            if key is not None:
+                with self._lock:
+                    if self._inflight.get(key, (None,))[0] is future:
+                        del self._inflight[key]
+                    if self.freshness > 0 and generation == self._generation:
+                        self._results[key] = (time.monotonic(), future)
+            future.set_result(result)
+
+    def _forget(self, key, future):
+        if key is not None:
+            with self._lock:
+                if self._inflight.get(key, (None,))[0] is future:
+                    del self._inflight[key]
+
+    def stats(self):
+        """Request and driver call counters; savedCalls is the number of driver calls avoided."""
+        return {'requests': self.requests, 'driverCalls': self.driverCalls, 'coalesced': self.coalesced,
+                'reused': self.reused, 'savedCalls': self.coalesced + self.reused}
+
+    def close(self, closeDevice=False):
+        """Runs the queued calls, stops the scheduler thread and optionally closes the device."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # after everything already queued
+            self._queue.put((BACKGROUND + 1, next(self._order), None))
+        self._thread.join()
+        if closeDevice:
+            self.device.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,447 @@
+"""
+Deterministic, pure Python stand-in for TLSPCNT_64.dll.
+
+    from TLSPCNT import TLSPCNT
+    from spcnt_simulator import SimulatedBackend
+
+    dev = TLSPCNT(backend=SimulatedBackend(rate=2e6, latency=50e-6))
+    dev.conncect_to_first_device()
+
+The backend implements the TLSPCNT_* functions with the calling convention of the DLL,
+so the unmodified TLSPCNT class runs on top of it. Photon counts are Poisson distributed
+and drawn from a seeded generator, so a given seed and call sequence always produces the
+same data. Simulated time advances by one bin width per generated bin, not with the wall
+clock; only the optional per-call latency costs real time.
+"""
+import functools
+import time
+from ctypes import memmove
+
+import numpy as np
+
+from TLSPCNT import BIN_WIDTH_UNIT, DEAD_TIME_UNIT
+from spcnt_ctypes import argValue, storeArg
+from spcnt_registers import OperationBit, Register
+
+VI_SUCCESS = 0
+VI_ERROR_PARAMETER2 = 0xBFFC0002 - (1 << 32)
+VI_ERROR_INV_OBJECT = 0xBFFF000E - (1 << 32)
+VI_ERROR_RSRC_NFOUND = 0xBFFF0011 - (1 << 32)
+VI_ERROR_IO = 0xBFFF003E - (1 << 32)
+
+_MESSAGES = {
+    VI_SUCCESS: 'No error (the call was successful).',
+    VI_ERROR_PARAMETER2: 'Parameter 2 out of range.',
+    VI_ERROR_INV_OBJECT: 'Invalid session handle.',
+    VI_ERROR_RSRC_NFOUND: 'Resource not found.',
+    VI_ERROR_IO: 'Could not perform operation because of I/O error.',
+}
+
+
+class SimulatedDevice:
+    """
+    State of one simulated counter.
+
+    Args:
+        serialNumber(str) : Serial number, the resource name is 'SIM::<serialNumber>'.
+        rate(float) : True photon rate at the detector in counts/s, dark counts excluded.
+        darkRate(float) : Dark count rate in counts/s.
+        seed(int) : Seed of the random generator.
+    """
+    def __init__(self, serialNumber, rate=1e5, darkRate=100.0, seed=0):
+        self.serialNumber = serialNumber
+        self.resourceName = 'SIM::%s' % serialNumber
+        self.rate = rate
+        self.darkRate = darkRate
+        self.seed = seed
+        self.session = None
+        self.connected = True
+        self.reset()
+
+    def reset(self):
+        self.rng = np.random.default_rng(self.seed)
+        self.binWidth = 1
+        self.arrayLength = 100
+        self.deadTime = 35
+        self.averageCount = 1
+        self.threshold = 1
+        self.brightness = 1.0
+        self.zeroValue = 0.0
+        self.zeroingPolls = 0
+        self.calibrationMessage = ''
+        self.frequencyCounting = True
+        self.time = 0.0
+        self.registers = {}
+        self.resetStatistics()
+
+    def resetStatistics(self):
+        self.frequency = (0.0, np.inf, -np.inf, 0.0)
+        self._freqSum = 0.0
+        self._freqN = 0
+
+    def drawBins(self, n):
+        """Returns n bins of observed counts and advances the simulated time."""
+        T = self.binWidth * BIN_WIDTH_UNIT
+        tau = self.deadTime * DEAD_TIME_UNIT
+        r = self.rate + self.darkRate
+        # non-paralyzable detector: observed rate m = r / (1 + r * tau)
+        m = r / (1.0 + r * tau)
+        self.time += n * T
+        return self.rng.poisson(m * T, n)
+
+    def measureFrequency(self):
+        if self.frequencyCounting:
+            n = self.averageCount
+            f = self.drawBins(n).sum() / (n * self.binWidth * BIN_WIDTH_UNIT)
+            self._freqSum += f
+            self._freqN += 1
+            _, fmin, fmax, _ = self.frequency
+            self.frequency = (f, min(fmin, f), max(fmax, f), self._freqSum / self._freqN)
+        return self.frequency
+
+
+def _api(fn):
+    """Adds the injected latency and resolves the session handle of a driver function."""
+    @functools.wraps(fn)
+    def call(self, session, *args):
+        self._delay(fn.__name__)
+        dev = self._sessions.get(argValue(session))
+        if dev is None:
+            return VI_ERROR_INV_OBJECT
+        if not dev.connected:
+            return VI_ERROR_IO
+        return fn(self, dev, *args)
+    return call
+
+
+class SimulatedBackend:
+    """
+    Simulated TLSPCNT driver with one or more devices attached.
+
+    Args:
+        devices(list) : Serial numbers, or SimulatedDevice instances, of the attached devices.
+        rate(float) : Photon rate in counts/s for devices given by serial number.
+        darkRate(float) : Dark count rate in counts/s for devices given by serial number.
+        latency(float or callable) : Added to every driver call in seconds, or latency(functionName).
+        zeroingPolls(int) : Number of getZeroState polls zeroing takes to complete.
+        seed(int) : Seed of the first device, further devices use seed + index.
+    """
+    def __init__(self, devices=('SIM0001',), rate=1e5, darkRate=100.0, latency=0.0, zeroingPolls=10, seed=0):
+        self.devices = []
+        for i, dev in enumerate(devices):
+            if not isinstance(dev, SimulatedDevice):
+                dev = SimulatedDevice(dev, rate, darkRate, seed + i)
+            self.devices.append(dev)
+        self.latency = latency
+        self.zeroingPolls = zeroingPolls
+        self._sessions = {}
+        self._nextSession = 1
+        self._found = []
+
+    def device(self, serialNumber):
+        for dev in self.devices:
+            if dev.serialNumber == serialNumber:
+                return dev
+        raise LookupError(serialNumber)
+
+    def unplug(self, serialNumber):
+        """Disconnects a device: calls on its session fail with VI_ERROR_IO and it is not found anymore."""
+        self.device(serialNumber).connected = False
+
+    def plug(self, serialNumber, powerCycle=True):
+        """
+        Reconnects an unplugged device. Its old session stays invalid.
+
+        Args:
+            powerCycle(bool) : The device lost power and comes back with default settings.
+        """
+        dev = self.device(serialNumber)
+        if dev.session is not None:
+            self._sessions.pop(dev.session, None)
+            dev.session = None
+        if powerCycle:
+            dev.reset()
+        dev.connected = True
+
+    def _delay(self, name):
+        latency = self.latency(name) if callable(self.latency) else self.latency
+        if latency <= 0:
+            return
+        if latency >= 2e-3:
+            time.sleep(latency)
+        else:
+            # sleep() is too coarse for microsecond latencies
+            end = time.perf_counter() + latency
+            while time.perf_counter() < end:
+                pass
+
+    # session handling
+
+    def TLSPCNT_init(self, resourceName, IDQuery, resetDevice, session):
+        self._delay('TLSPCNT_init')
+        name = argValue(resourceName)
+        name = name.decode() if isinstance(name, bytes) else name
+        for dev in self.devices:
+            if dev.resourceName == name and dev.connected:
+                break
+        else:
+            return VI_ERROR_RSRC_NFOUND
+        if dev.session is not None:
+            self._sessions.pop(dev.session, None)
+        if argValue(resetDevice):
+            dev.reset()
+        dev.session = self._nextSession
+        self._nextSession += 1
+        self._sessions[dev.session] = dev
+        storeArg(session, dev.session)
+        return VI_SUCCESS
+
+    def TLSPCNT_close(self, session):
+        self._delay('TLSPCNT_close')
+        dev = self._sessions.pop(argValue(session), None)
+        if dev is not None:
+            dev.session = None
+        return VI_SUCCESS
+
+    def TLSPCNT_findRsrc(self, session, resourceCount):
+        self._delay('TLSPCNT_findRsrc')
+        self._found = [dev for dev in self.devices if dev.connected]
+        storeArg(resourceCount, len(self._found))
+        return VI_SUCCESS
+
+    def TLSPCNT_getRsrcName(self, session, index, resourceName):
+        self._delay('TLSPCNT_getRsrcName')
+        index = argValue(index)
+        if not 0 <= index < len(self._found):
+            return VI_ERROR_PARAMETER2
+        storeArg(resourceName, self._found[index].resourceName)
+        return VI_SUCCESS
+
+    def TLSPCNT_getRsrcInfo(self, session, index, modelName, serialNumber, manufacturer, deviceAvailable):
+        self._delay('TLSPCNT_getRsrcInfo')
+        index = argValue(index)
+        if not 0 <= index < len(self._found):
+            return VI_ERROR_PARAMETER2
+        dev = self._found[index]
+        storeArg(modelName, 'SPCNT')
+        storeArg(serialNumber, dev.serialNumber)
+        storeArg(manufacturer, 'Thorlabs')
+        storeArg(deviceAvailable, dev.session is None)
+        return VI_SUCCESS
+
+    def TLSPCNT_errorMessage(self, session, statusCode, description):
+        storeArg(description, _MESSAGES.get(argValue(statusCode), 'Unknown Status Code'))
+        return VI_SUCCESS
+
+    # device functions
+
+    @_api
+    def TLSPCNT_reset(self, dev):
+        dev.reset()
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_self_test(self, dev, selfTestResult, description):
+        storeArg(selfTestResult, 0)
+        storeArg(description, 'Self test passed')
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_revision_query(self, dev, instrumentDriverRevision, firmwareRevision):
+        storeArg(instrumentDriverRevision, 'simulator')
+        storeArg(firmwareRevision, 'simulator')
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_identification_query(self, dev, manufacturerName, deviceName, serialNumber):
+        storeArg(manufacturerName, 'Thorlabs')
+        storeArg(deviceName, 'SPCNT')
+        storeArg(serialNumber, dev.serialNumber)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_writeRegister(self, dev, reg, value):
+        dev.registers[argValue(reg)] = argValue(value)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_readRegister(self, dev, reg, value):
+        reg = argValue(reg)
+        if reg == Register.OPER_COND:
+            # zeroing progresses with every poll of its state, like getZeroState
+            self._advanceZeroing(dev)
+            content = OperationBit.CALIBRATING if dev.zeroingPolls > 0 else 0
+        else:
+            content = dev.registers.get(reg, 0) & 0xFFFF
+        storeArg(value, content - 0x10000 if content > 0x7FFF else int(content))
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_presetRegister(self, dev):
+        dev.registers.clear()
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_setDisplayBrightness(self, dev, val):
+        val = argValue(val)
+        if not 0.0 <= val <= 1.0:
+            return VI_ERROR_PARAMETER2
+        dev.brightness = val
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getDisplayBrightness(self, dev, val):
+        storeArg(val, dev.brightness)
+        return VI_SUCCESS
+
+    # zeroing
+
+    @_api
+    def TLSPCNT_startZeroing(self, dev):
+        dev.zeroingPolls = self.zeroingPolls
+        dev.calibrationMessage = 'Zeroing started'
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_abortZeroing(self, dev):
+        dev.zeroingPolls = 0
+        dev.calibrationMessage = 'Zeroing aborted'
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getZeroState(self, dev, state):
+        self._advanceZeroing(dev)
+        storeArg(state, dev.zeroingPolls > 0)
+        return VI_SUCCESS
+
+    def _advanceZeroing(self, dev):
+        if dev.zeroingPolls > 0:
+            dev.zeroingPolls -= 1
+            done = self.zeroingPolls - dev.zeroingPolls
+            dev.calibrationMessage = 'Zeroing %d%%' % (100 * done // self.zeroingPolls)
+            if dev.zeroingPolls == 0:
+                # measure the dark rate over one second of simulated time
+                dev.zeroValue = float(dev.rng.poisson(dev.darkRate))
+                dev.calibrationMessage = 'Zeroing finished'
+
+    @_api
+    def TLSPCNT_getCalibrationMessage(self, dev, msg):
+        storeArg(msg, dev.calibrationMessage)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_setZeroValue(self, dev, val):
+        dev.zeroValue = argValue(val)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getZeroValue(self, dev, val):
+        storeArg(val, dev.zeroValue)
+        return VI_SUCCESS
+
+    # settings
+
+    @_api
+    def TLSPCNT_setFrequencyCountThreshold(self, dev, val):
+        dev.threshold = argValue(val)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getFrequencyCountThreshold(self, dev, val):
+        storeArg(val, dev.threshold)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_setArrayLenght(self, dev, val):
+        val = argValue(val)
+        if val < 1:
+            return VI_ERROR_PARAMETER2
+        dev.arrayLength = val
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getArrayLenght(self, dev, val):
+        storeArg(val, dev.arrayLength)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_setBinWidth(self, dev, val):
+        val = argValue(val)
+        if val < 1:
+            return VI_ERROR_PARAMETER2
+        dev.binWidth = val
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getBinWidth(self, dev, val):
+        storeArg(val, dev.binWidth)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_setDeadTime(self, dev, val):
+        dev.deadTime = argValue(val)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getDeadtime(self, dev, val):
+        storeArg(val, dev.deadTime)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_setAverageCount(self, dev, val):
+        val = argValue(val)
+        if val < 1:
+            return VI_ERROR_PARAMETER2
+        dev.averageCount = val
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getAverageCount(self, dev, val):
+        storeArg(val, dev.averageCount)
+        return VI_SUCCESS
+
+    # measurements
+
+    @_api
+    def TLSPCNT_startFrequencyCounting(self, dev):
+        dev.frequencyCounting = True
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_stopFrequencyCounting(self, dev):
+        dev.frequencyCounting = False
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getFrequencyCountingState(self, dev, val):
+        storeArg(val, dev.frequencyCounting)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_resetStatistics(self, dev):
+        dev.resetStatistics()
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getFrequency(self, dev, freq, fmin, fmax, favg):
+        for arg, value in zip((freq, fmin, fmax, favg), dev.measureFrequency()):
+            storeArg(arg, float(value))
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getCount(self, dev, val):
+        storeArg(val, int(dev.drawBins(1)[0]))
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getTime(self, dev, val):
+        storeArg(val, dev.time)
+        return VI_SUCCESS
+
+    @_api
+    def TLSPCNT_getBins(self, dev, bins, blen):
+        n = min(argValue(blen), dev.arrayLength)
+        data = dev.drawBins(n).astype(np.int32)
+        memmove(bins, data.ctypes.data, data.nbytes)
+        storeArg(blen, n)
+        return VI_SUCCESS
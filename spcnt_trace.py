@@ -0,0 +1,289 @@
+"""
+Recording of driver calls into a binary trace, and a backend replaying such a trace.
+
+TraceRecorder wraps the driver handle of a TLSPCNT session and logs every TLSPCNT_*
+call: its arguments, the values written to its out-parameters, the status code, the
+start time and the duration. ReplayBackend runs the unmodified TLSPCNT class against a
+trace, on any platform and without hardware, at the original timing or as fast as
+possible.
+
+    recorder = record(dev, 'session.trace')   # on the lab PC
+    ...
+    recorder.detach(dev)
+
+    dev = TLSPCNT(backend=ReplayBackend('session.trace'))   # anywhere
+    dev.open(b'USB0::0x1313::...')
+
+Trace format, little endian: the magic b'TLSPTRC1', then records. A record starts with a
+tag byte. b'F' defines a function: uint16 id, uint8 name length, name. b'C' is a call:
+uint16 function id, float64 start time in seconds since the recording started, float64
+duration, int32 status, uint8 argument count, then the arguments. An argument is a tag byte
+and its value: b'n' none, b'i' int64, b'd' float64, b'b' uint32 length and bytes, b'a'
+uint32 count and int32 values. In-parameters are logged with the value passed, out-parameters
+with the value after the call.
+"""
+import collections
+import struct
+import threading
+import time
+from ctypes import Array, _Pointer, c_int32, memmove, sizeof, string_at
+
+from TLSPCNT import _SIGNATURES, prototypeDriver, rawFunction
+from spcnt_ctypes import argValue, storeArg
+
+MAGIC = b'TLSPTRC1'
+
+_FUNCTION = struct.Struct('<cHB')
+_CALL = struct.Struct('<cHddiB')
+_INT = struct.Struct('<q')
+_DOUBLE = struct.Struct('<d')
+_LENGTH = struct.Struct('<I')
+
+# function: (index of the array argument, index of the argument holding its length)
+_ARRAYS = {'TLSPCNT_getBins': (1, 2)}
+
+
+def _isOut(arg):
+    return hasattr(arg, '_obj') or isinstance(arg, (Array, _Pointer))
+
+
+def _encode(value):
+    if value is None:
+        return b'n'
+    if isinstance(value, float):
+        return b'd' + _DOUBLE.pack(value)
+    if isinstance(value, int):
+        return b'i' + _INT.pack(value)
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b'b' + _LENGTH.pack(len(value)) + value
+    raise TypeError('Cannot trace argument %r' % (value,))
+
+
+class TraceRecorder:
+    """
+    Driver handle that writes every TLSPCNT_* call of the wrapped driver to a trace file.
+
+    Args:
+        driver : ctypes library or backend object providing the TLSPCNT_* functions.
+        path(str) : Trace file, overwritten.
+    """
+    def __init__(self, driver, path):
+        self.driver = driver
+        self.path = path
+        prototypeDriver(driver)
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.calls = 0
+
+    def __getattr__(self, name):
+        fn = getattr(self.__dict__['driver'], name)
+        if not name.startswith('TLSPCNT_'):
+            return fn
+        wrapper = self.wrap(name, fn)
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def rawFunction(self, name, restype):
+        """Traced counterpart of TLSPCNT.rawFunction, used for the hot-path getters."""
+        return self.wrap(name, rawFunction(self.driver, name, restype))
+
+    def wrap(self, name, fn):
+        clock = time.perf_counter
+        arrays = _ARRAYS.get(name)
+
+        def call(*args):
+            t0 = clock()
+            status = fn(*args)
+            elapsed = clock() - t0
+            self._write(name, t0 - self._start, elapsed, status, args, arrays)
+            return status
+        call.__name__ = name
+        return call
+
+    def _write(self, name, t, elapsed, status, args, arrays):
+        encoded = []
+        for i, arg in enumerate(args):
+            if arrays is not None and i == arrays[0]:
+                n = argValue(args[arrays[1]])
+                data = string_at(arg, n * sizeof(c_int32)) if n else b''
+                encoded.append(b'a' + _LENGTH.pack(n) + data)
+            elif isinstance(arg, _Pointer):
+                encoded.append(_encode(arg.contents.value))
+            else:
+                encoded.append(_encode(argValue(arg)))
+        with self._lock:
+            if self._file is None:
+                return
+            fnId = self._ids.get(name)
+            if fnId is None:
+                fnId = self._ids[name] = len(self._ids)
+                encodedName = name.encode()
+                self._file.write(_FUNCTION.pack(b'F', fnId, len(encodedName)) + encodedName)
+            self._file.write(_CALL.pack(b'C', fnId, t, elapsed, status, len(encoded)))
+            self._file.write(b''.join(encoded))
+            self.calls += 1
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def detach(self, device):
+        """Rebinds device to the wrapped driver and closes the trace."""
+        device._bindDriver(self.driver)
+        self.close()
+
+
+def record(device, path):
+    """Starts tracing the driver calls of a TLSPCNT session into path. Returns the TraceRecorder."""
+    recorder = TraceRecorder(device.dll, path)
+    device._bindDriver(recorder)
+    return recorder
+
+
+TraceCall = collections.namedtuple('TraceCall', 'name t duration status args')
+
+
+def read_trace(path):
+    """
+    Parses a trace file.
+
+    Returns:
+        list: TraceCall per call, in recording order. Array arguments are bytes of int32 values.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('%s is not a TLSPCNT trace' % path)
+    names = {}
+    calls = []
+    pos = len(MAGIC)
+    while pos < len(data):
+        tag = data[pos:pos + 1]
+        if tag == b'F':
+            _, fnId, length = _FUNCTION.unpack_from(data, pos)
+            pos += _FUNCTION.size
+            names[fnId] = data[pos:pos + length].decode()
+            pos += length
+            continue
+        if tag != b'C':
+            raise ValueError('Corrupt trace at byte %d' % pos)
+        if pos + _CALL.size > len(data):
+            # truncated by a crash during recording
+            break
+        _, fnId, t, duration, status, nargs = _CALL.unpack_from(data, pos)
+        pos += _CALL.size
+        args = []
+        for _ in range(nargs):
+            kind = data[pos:pos + 1]
+            pos += 1
+            if kind == b'n':
+                args.append(None)
+            elif kind == b'i':
+                args.append(_INT.unpack_from(data, pos)[0])
+                pos += _INT.size
+            elif kind == b'd':
+                args.append(_DOUBLE.unpack_from(data, pos)[0])
+                pos += _DOUBLE.size
+            elif kind in (b'b', b'a'):
+                n = _LENGTH.unpack_from(data, pos)[0]
+                pos += _LENGTH.size
+                size = n if kind == b'b' else n * sizeof(c_int32)
+                args.append(data[pos:pos + size])
+                pos += size
+            else:
+                raise ValueError('Corrupt trace at byte %d' % pos)
+        calls.append(TraceCall(names[fnId], t, duration, status, args))
+    return calls
+
+
+class ReplayError(LookupError):
+    """The code under test made a call the trace has no more records of."""
+
+
+class ReplayBackend:
+    """
+    Driver backend answering TLSPCNT_* calls from a trace.
+
+    Every function replays its own recorded calls in order: the recorded out-parameter
+    values are written to the out-parameters of the call and the recorded status is
+    returned. The arguments passed in are not compared with the recording.
+
+    Args:
+        path(str) : Trace file written by TraceRecorder.
+        realtime(bool) : Reproduce the recorded timing: every call returns no earlier than
+        its recorded end relative to the first replayed call. Otherwise as fast as possible.
+    """
+    def __init__(self, path, realtime=False):
+        self.calls = read_trace(path)
+        self.realtime = realtime
+        self._queues = collections.defaultdict(collections.deque)
+        for call in self.calls:
+            self._queues[call.name].append(call)
+        self._functions = {}
+        self._lock = threading.Lock()
+        self._offset = None
+
+    def remaining(self):
+        """Number of calls left per function."""
+        return {name: len(q) for name, q in self._queues.items() if q}
+
+    def rawFunction(self, name, restype):
+        return getattr(self, name)
+
+    def __getattr__(self, name):
+        if not name.startswith('TLSPCNT_'):
+            raise AttributeError(name)
+        if name not in _SIGNATURES and name not in self.__dict__['_queues']:
+            raise AttributeError(name)
+        queue = self._queues[name]
+        arrays = _ARRAYS.get(name)
+
+        def call(*args):
+            with self._lock:
+                if not queue:
+                    raise ReplayError('No more recorded calls of %s' % name)
+                recorded = queue.popleft()
+                if self.realtime:
+                    self._wait(recorded)
+            for i, (arg, value) in enumerate(zip(args, recorded.args)):
+                if not _isOut(arg) or value is None:
+                    continue
+                if arrays is not None and i == arrays[1]:
+                    # written together with the array
+                    continue
+                if arrays is not None and i == arrays[0]:
+                    # like the driver, write at most the capacity the caller passed in and report the count
+                    capacity = args[arrays[1]]
+                    n = min(len(value) // sizeof(c_int32), argValue(capacity))
+                    memmove(arg, value, n * sizeof(c_int32))
+                    storeArg(capacity, n)
+                elif isinstance(arg, _Pointer):
+                    arg.contents.value = value
+                elif isinstance(arg, Array):
+                    storeArg(arg, value.decode(errors='replace') if isinstance(value, bytes) else value)
+                else:
+                    storeArg(arg, value)
+            return recorded.status
+        call.__name__ = name
+        self.__dict__[name] = call
+        return call
+
+    def _wait(self, recorded):
+        now = time.perf_counter()
+        if self._offset is None:
+            self._offset = now - recorded.t
+        delay = self._offset + recorded.t + recorded.duration - now
+        if delay > 0:
+            time.sleep(delay)
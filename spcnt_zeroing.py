@@ -0,0 +1,226 @@
+"""
+Non-blocking zeroing of one or many TLSPCNT devices.
+
+zero_async() starts zeroing and returns a concurrent.futures.Future of the new zero
+value right away. A single background thread polls getZeroState() of all zeroing
+devices with an adaptive interval: short while the calibration message changes, growing
+geometrically while nothing happens. Cancelling the future or running into the timeout
+aborts zeroing on the device.
+
+    futures = zero_all(pool, timeout=120, onMessage=lambda dev, msg: print(msg))
+    zeroValues = {serial: f.result() for serial, f in futures.items()}
+
+    # asyncio
+    zeroValue = await asyncio.wrap_future(zero_async(dev))
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError
+
+
+class _ZeroingJob:
+    def __init__(self, device, future, timeout, onMessage, minInterval, maxInterval, backoff, lock):
+        self.device = device
+        self.future = future
+        self.onMessage = onMessage
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.backoff = backoff
+        self.lock = lock
+        self.timeout = timeout
+        self.deadline = None
+        self.interval = minInterval
+        self.message = None
+        self.started = False
+        self.finished = False
+        self.polls = 0
+        # delivered by step() once the lock is released: a callback using the same session must not deadlock
+        self._messages = []
+        self._outcome = None
+
+    def step(self):
+        """Does the next driver call. Returns the time of the following one, None when done."""
+        if self.finished:
+            return None
+        try:
+            if self.lock is not None:
+                with self.lock:
+                    due = self._step()
+            else:
+                due = self._step()
+        except Exception as e:
+            self._abortLocked()
+            self._finish(exception=e)
+            due = None
+        self._deliver()
+        return None if self.finished else due
+
+    def _step(self):
+        dev = self.device
+        now = time.monotonic()
+        if self.future.cancelled():
+            self._abort()
+            self.finished = True
+            return None
+        if not self.started:
+            dev.startZeroing()
+            self.started = True
+            if self.timeout is not None:
+                self.deadline = now + self.timeout
+            return self._next(now)
+        if self.deadline is not None and now >= self.deadline:
+            self._abort()
+            self._finish(exception=TimeoutError('Zeroing did not finish within %g s' % self.timeout))
+            return None
+        busy = dev.getZeroState()
+        self.polls += 1
+        message = dev.getCalibrationMessage()
+        if message != self.message:
+            # progress: poll at the short interval again
+            self.message = message
+            self.interval = self.minInterval
+            if self.onMessage is not None and message:
+                self._messages.append(message)
+        else:
+            self.interval = min(self.interval * self.backoff, self.maxInterval)
+        if not busy:
+            self._finish(result=dev.getZeroValue())
+            return None
+        return self._next(now)
+
+    def _next(self, now):
+        due = now + self.interval
+        return due if self.deadline is None else min(due, self.deadline)
+
+    def _abort(self):
+        if self.started:
+            try:
+                self.device.abortZeroing()
+            except Exception:
+                pass
+
+    def _abortLocked(self):
+        if self.lock is not None:
+            with self.lock:
+                self._abort()
+        else:
+            self._abort()
+
+    def _finish(self, result=None, exception=None):
+        self.finished = True
+        self._outcome = (result, exception)
+
+    def _deliver(self):
+        messages, self._messages = self._messages, []
+        for message in messages:
+            try:
+                self.onMessage(self.device, message)
+            except Exception as e:
+                if not self.finished:
+                    self._abortLocked()
+                    self._finish(exception=e)
+                break
+        if self._outcome is None:
+            return
+        result, exception = self._outcome
+        self._outcome = None
+        try:
+            if exception is not None:
+                self.future.set_exception(exception)
+            else:
+                self.future.set_result(result)
+        except InvalidStateError:
+            # cancelled meanwhile
+            pass
+
+
+class ZeroingScheduler:
+    """
+    Polls any number of zeroing jobs from one thread. The thread runs only while there
+    are jobs.
+    """
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, job, due=None):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() if due is None else due, next(self._order), job))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='TLSPCNT-zeroing', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._thread = None
+                        return
+                    due, _, job = self._heap[0]
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(wait)
+            due = job.step()
+            if due is not None:
+                self.submit(job, due)
+
+
+_scheduler = ZeroingScheduler()
+
+
+def zero_async(device, timeout=None, onMessage=None, minInterval=0.02, maxInterval=1.0, backoff=1.5,
+               lock=None, scheduler=None):
+    """
+    Starts zeroing a device without blocking.
+
+    Args:
+        device(TLSPCNT) : Open session.
+        timeout(float) : Abort zeroing after this many seconds and fail with TimeoutError, None for no limit.
+        onMessage(callable) : Called as onMessage(device, message) with every new calibration message,
+        on the polling thread and without lock held.
+        minInterval(float) : Poll interval in seconds after a change of the calibration message.
+        maxInterval(float) : Upper bound of the poll interval.
+        backoff(float) : Factor the interval grows by on every poll without a change.
+        lock(threading.Lock) : Optional lock held around the driver calls, for sessions that are
+        also used from other threads, e.g. AcquisitionEngine.lock.
+        scheduler(ZeroingScheduler) : Thread polling the device, default a module-wide scheduler.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the new zero value. cancel() aborts zeroing.
+    """
+    future = Future()
+    job = _ZeroingJob(device, future, timeout, onMessage, minInterval, maxInterval, backoff, lock)
+    scheduler = _scheduler if scheduler is None else scheduler
+
+    def cancelled(f):
+        if f.cancelled():
+            # wake the job up so it aborts zeroing right away
+            scheduler.submit(job)
+    future.add_done_callback(cancelled)
+    scheduler.submit(job)
+    return future
+
+
+def zero_all(devices, timeout=None, onMessage=None, **kwargs):
+    """
+    Zeroes several devices at the same time.
+
+    Args:
+        devices : List of sessions, dict of sessions or a TLSPCNTPool.
+        timeout, onMessage, kwargs : Passed on to zero_async for each device.
+
+    Returns:
+        list or dict: The futures, keyed like devices (by serial number for a pool).
+    """
+    devices = getattr(devices, 'devices', devices)
+    if isinstance(devices, dict):
+        return {key: zero_async(dev, timeout, onMessage, **kwargs) for key, dev in devices.items()}
+    return [zero_async(dev, timeout, onMessage, **kwargs) for dev in devices]
@@ -0,0 +1,107 @@
+"""
+Ring buffer protocol and overrun accounting of the acquisition engine, against the simulator.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+from spcnt_acquisition import AcquisitionEngine, RingBuffer  # noqa: E402
+from spcnt_simulator import SimulatedBackend  # noqa: E402
+
+
+def openDevice(latency=0.0):
+    dev = TLSPCNT(backend=SimulatedBackend(latency=latency))
+    dev.findRsrc()
+    dev.open(dev.getRsrcName(0))
+    return dev
+
+
+def test_wraparound():
+    ring = RingBuffer(8, np.int64)
+    for i in range(20):
+        ring.append(i)
+    out, cursor, lost = ring.read(0)
+    assert cursor == 20
+    # the oldest slot may be in the middle of being overwritten and is never returned
+    assert list(out) == list(range(13, 20))
+    assert lost == 0
+    out, cursor, lost = ring.read(cursor)
+    assert len(out) == 0 and cursor == 20 and lost == 0
+
+
+def test_lost():
+    ring = RingBuffer(8, np.int64)
+    for i in range(4):
+        ring.append(i)
+    out, cursor, lost = ring.read(0)
+    assert list(out) == [0, 1, 2, 3] and lost == 0
+    for i in range(4, 24):
+        ring.append(i)
+    out, cursor, lost = ring.read(cursor)
+    assert list(out) == list(range(17, 24))
+    assert cursor == 24
+    assert lost == 17 - 4
+    for i in range(24, 27):
+        ring.append(i)
+    out, cursor, lost = ring.read(cursor, maxCount=2)
+    assert list(out) == [24, 25] and cursor == 26 and lost == 0
+
+
+def test_concurrent_reader():
+    ring = RingBuffer(64, np.int64)
+    total = 200000
+
+    def write():
+        for i in range(1, total):
+            ring.append(i)
+    ring.append(0)
+    _, cursor, _ = ring.read(0)
+    writer = threading.Thread(target=write)
+    writer.start()
+    received, lost = 1, 0
+    expected = 1
+    while cursor < total:
+        ring.wait(cursor, 1.0)
+        out, newCursor, n = ring.read(cursor)
+        # every returned sample is intact and the samples are consecutive
+        if len(out):
+            assert out[0] == expected + n
+            assert np.array_equal(out, np.arange(out[0], out[0] + len(out)))
+            expected = out[-1] + 1
+        received += len(out)
+        lost += n
+        cursor = newCursor
+    writer.join()
+    assert received + lost == total
+
+
+def test_engine():
+    dev = openDevice()
+    engine = AcquisitionEngine(dev, period=1e-3, capacity=16, frequency=True)
+    with engine:
+        engine.wait(40, 5.0)
+    samples, cursor, lost = engine.read(0)
+    assert cursor >= 40
+    assert len(samples) == 15 and lost == 0
+    assert np.all(np.diff(samples['time']) > 0)
+    assert engine.errors == 0
+    dev.close()
+
+
+def test_overruns():
+    # every poll takes two periods
+    dev = openDevice(latency=1e-2)
+    engine = AcquisitionEngine(dev, period=5e-3)
+    with engine:
+        time.sleep(0.3)
+    assert engine.samples.head > 0
+    assert engine.overruns >= engine.samples.head // 2
+    dev.close()
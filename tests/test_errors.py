@@ -0,0 +1,36 @@
+"""
+Exceptions must survive pickling, as they do when sent by the acquisition server or another process.
+
+    python -m pytest tests
+"""
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import VI_ERROR_IO, VI_ERROR_PARAMETER1, DeviceIOError, ParameterError, TLSPCNTError, errorClass  # noqa: E402
+from spcnt_profile import ProfileError  # noqa: E402
+
+
+def roundTrip(error):
+    return pickle.loads(pickle.dumps(error))
+
+
+def test_driver_error():
+    for status in (VI_ERROR_IO, VI_ERROR_PARAMETER1, -1):
+        error = errorClass(status)(status, 'message')
+        copy = roundTrip(error)
+        assert type(copy) is type(error)
+        assert (copy.status, copy.message) == (status, 'message')
+        assert str(copy) == str(error)
+    assert str(DeviceIOError(VI_ERROR_IO)) == 'Unknown Status Code (0xBFFF003E)'
+    assert isinstance(roundTrip(ParameterError(VI_ERROR_PARAMETER1)), (TLSPCNTError, NameError))
+
+
+def test_profile_error():
+    error = ProfileError({'binWidth': (10, 20)})
+    copy = roundTrip(error)
+    assert type(copy) is ProfileError
+    assert copy.mismatches == {'binWidth': (10, 20)}
+    assert str(copy) == str(error) == 'Settings not applied: binWidth=10 (device reports 20)'
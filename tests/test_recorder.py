@@ -0,0 +1,58 @@
+"""
+Recording to .npy files, against the simulator.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+from spcnt_recorder import BINS_FILL, Recorder, load  # noqa: E402
+from spcnt_simulator import SimulatedBackend  # noqa: E402
+
+
+@pytest.fixture
+def device():
+    dev = TLSPCNT(backend=SimulatedBackend())
+    dev.findRsrc()
+    dev.open(dev.getRsrcName(0))
+    dev.setArrayLength(16)
+    yield dev
+    dev.close()
+
+
+def test_bins(device, tmp_path):
+    path = str(tmp_path / 'rec')
+    with Recorder(device, path, chunkSize=4) as recorder:
+        for i in range(10):
+            recorder.addBins(float(i), device.getBins())
+        # a short readout is padded
+        recorder.addBins(10.0, np.arange(5))
+        with pytest.raises(ValueError):
+            recorder.addBins(11.0, np.zeros(17))
+    data = load(path)
+    assert len(data['bins_time']) == len(data['bins']) == 11
+    assert data['bins'].shape == (11, 16)
+    assert list(data['bins'][10, :5]) == list(range(5))
+    assert np.all(data['bins'][10, 5:] == BINS_FILL)
+
+
+def test_write_error(device, tmp_path):
+    recorder = Recorder(device, str(tmp_path / 'rec'), chunkSize=1)
+
+    def fail(name, rows):
+        raise OSError('disk full')
+    recorder._sink.append = fail
+    # raised by one of the next calls, once the writer has failed
+    with pytest.raises(OSError):
+        for _ in range(100):
+            recorder.addCounts([0.0], [1])
+            time.sleep(0.01)
+    with pytest.raises(OSError):
+        recorder.close()
@@ -0,0 +1,47 @@
+"""
+Reconnecting ResilientSession after a simulated USB disconnect.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+from spcnt_resilient import ResilientSession  # noqa: E402
+from spcnt_simulator import SimulatedBackend  # noqa: E402
+from spcnt_zeroing import zero_async  # noqa: E402
+
+
+def openSession():
+    backend = SimulatedBackend(darkRate=500, zeroingPolls=3)
+    session = ResilientSession(TLSPCNT(backend=backend), 'SIM0001', retryInterval=0.01)
+    session.open()
+    return backend, session
+
+
+def test_zero_restored():
+    backend, session = openSession()
+    session.startZeroing()
+    while session.getZeroState():
+        time.sleep(0.01)
+    zeroValue = session.device.getZeroValue()
+    assert zeroValue != 0
+    backend.unplug('SIM0001')
+    backend.plug('SIM0001')
+    session.getCount()
+    assert len(session.gaps) == 1
+    assert session.device.getZeroValue() == zeroValue
+    session.close()
+
+
+def test_zero_async_restored():
+    backend, session = openSession()
+    zeroValue = zero_async(session, timeout=10, minInterval=0.01).result(10)
+    backend.unplug('SIM0001')
+    backend.plug('SIM0001')
+    session.getCount()
+    assert session.device.getZeroValue() == zeroValue
+    session.close()
@@ -0,0 +1,45 @@
+"""
+Acquisition server and client in one process, against the simulator.
+
+    python -m pytest tests
+"""
+import os
+import sys
+from multiprocessing.connection import AuthenticationError, Client
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import TLSPCNT, ParameterError  # noqa: E402
+from spcnt_server import AcquisitionClient, AcquisitionServer  # noqa: E402
+from spcnt_simulator import SimulatedBackend  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    dev = TLSPCNT(backend=SimulatedBackend())
+    dev.findRsrc()
+    dev.open(dev.getRsrcName(0))
+    server = AcquisitionServer(dev, address=('localhost', 0))
+    server.start()
+    yield server
+    server.close()
+    dev.close()
+
+
+def test_authentication(server):
+    assert len(server.authkey) == 32
+    # a connection that never completes the handshake does not block the others
+    idle = Client(server.address)
+    with pytest.raises(AuthenticationError):
+        AcquisitionClient(server.address, b'wrong')
+    with AcquisitionClient(server.address, server.authkey) as client:
+        assert client.getBinWidth() == server.device.getBinWidth()
+    idle.close()
+
+
+def test_driver_error(server):
+    with AcquisitionClient(server.address, server.authkey) as client:
+        with pytest.raises(ParameterError):
+            client.setBinWidth(0)
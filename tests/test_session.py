@@ -0,0 +1,34 @@
+"""
+Scheduling and coalescing of SharedSession, against the simulator.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+from spcnt_session import BACKGROUND, SharedSession  # noqa: E402
+from spcnt_simulator import SimulatedBackend  # noqa: E402
+
+
+def test_promotion():
+    dev = TLSPCNT(backend=SimulatedBackend(latency=0.01))
+    dev.findRsrc()
+    dev.open(dev.getRsrcName(0))
+    with SharedSession(dev) as shared:
+        # keeps the scheduler busy while the others are queued
+        shared.submit('getFrequency')
+        others = [shared.submit('getBinWidth', priority=BACKGROUND), shared.submit('getDeadTime', priority=BACKGROUND)]
+        background = shared.submit('getCount', priority=BACKGROUND)
+        foreground = shared.submit('getCount')
+        assert foreground is background
+        done = []
+        for name, future in (('count', foreground), ('binWidth', others[0]), ('deadTime', others[1])):
+            future.add_done_callback(lambda _, name=name: done.append(name))
+        for future in others:
+            future.result()
+        assert done == ['count', 'binWidth', 'deadTime']
+    assert shared.driverCalls == 4 and shared.coalesced == 1
+    dev.close()
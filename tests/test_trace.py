@@ -0,0 +1,36 @@
+"""
+Recording a simulator session and replaying it.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TLSPCNT import TLSPCNT  # noqa: E402
+from spcnt_simulator import SimulatedBackend  # noqa: E402
+from spcnt_trace import ReplayBackend, record  # noqa: E402
+
+
+def test_replay(tmp_path):
+    path = str(tmp_path / 'session.trace')
+    dev = TLSPCNT(backend=SimulatedBackend())
+    dev.findRsrc()
+    dev.open(dev.getRsrcName(0))
+    dev.setArrayLength(100)
+    recorder = record(dev, path)
+    bins = [dev.getBins(), dev.getBins()]
+    count = dev.getCount()
+    recorder.detach(dev)
+    dev.close()
+
+    replay = TLSPCNT(backend=ReplayBackend(path))
+    # a buffer smaller than the recorded array is not written past its end
+    buffer = np.full(200, -1, np.int32)
+    assert np.array_equal(replay.getBins(buffer[:10]), bins[0][:10])
+    assert np.all(buffer[10:] == -1)
+    assert np.array_equal(replay.getBins(), bins[1])
+    assert replay.getCount() == count